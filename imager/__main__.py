@@ -28,6 +28,7 @@ def parse():
     parser.add_argument('-e','--encode', action='store_true',  help='encode a text file into an image')
     parser.add_argument('-t','--test',   action='store_true',  help='run a unit test on Image and Editor')
     parser.add_argument('-g','--grade',   action='store_true', help='grade the assignment')
+    parser.add_argument('-b','--bench',   action='store_true', help='time the geometric operations')
     return parser.parse_args()
 
 
@@ -53,6 +54,14 @@ def unittest():
     test_all()
 
 
+def benchmark():
+    """
+    Times the geometric Editor operations, with and without redrawing the result
+    """
+    from benchmark import run
+    run()
+
+
 def grade(image):
     """
     Grades the assignment.
@@ -99,6 +108,8 @@ def execute():
     # Switch on the options
     if args.test:
         unittest()
+    elif args.bench:
+        benchmark()
     elif args.grade:
         grade(image)
     elif args.encode:
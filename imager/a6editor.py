@@ -11,6 +11,8 @@ Author: Walker M. White (wmw2), Philip Cipollina(pjc272), Luke Marcinkiewicz(lam
 Date:    October 20, 2017 (Python 3 Version), November 16, 2017 (Assignment)
 """
 import a6history
+import lut
+import masks
 import math #for math.ceil-need to think of a better way
 
 
@@ -36,86 +38,61 @@ class Editor(a6history.ImageHistory):
     def invert(self):
         """
         Inverts the current image, replacing each element with its color complement
+        
+        Each color value v becomes 255-v.  Since this only depends on v, we use a lookup
+        table (see the module lut) instead of computing it for every pixel.
         """
-        current = self.getCurrent()
-        for pos in range(current.getLength()):
-            rgb = current.getFlatPixel(pos)
-            red   = 255 - rgb[0]
-            green = 255 - rgb[1]
-            blue  = 255 - rgb[2]
-            rgb = (red,green,blue) # New pixel value
-            current.setFlatPixel(pos,rgb)
+        lut.apply(self.getCurrent(),lut.invert())
     
     def transpose(self):
         """
         Transposes the current image
         
-        Transposing is tricky, as it is hard to remember which values have been changed 
-        and which have not.  To simplify the process, we copy the current image and use
-        that as a reference.  So we change the current image with setPixel, but read
-        (with getPixel) from the copy.
+        Transposing is tricky, as it is hard to remember which values have been changed
+        and which have not.  So we do not move any pixels at all.  The image just records
+        that it is transposed, and reads its rows from the columns of the pixel list (see
+        the method transpose in class Image).  The pixels are rearranged in one pass
+        when a filter or the display needs them in order.
         
         The transposed image will be drawn on the screen immediately afterwards.
         """
-        current  = self.getCurrent()
-        original = current.copy()
-        current.setWidth(current.getHeight())
-        
-        for row in range(current.getHeight()):
-            for col in range(current.getWidth()):
-                current.setPixel(row,col,original.getPixel(col,row))
+        self.getCurrent().transpose()
     
     def reflectHori(self):
         """
         Reflects the current image around the horizontal middle.
+        
+        Like transpose, this only changes the orientation of the image.
         """
-        current = self.getCurrent()
-        for h in range(current.getWidth()//2):
-            for row in range(current.getHeight()):
-                k = current.getWidth()-1-h
-                current.swapPixels(row,h,row,k)
+        self.getCurrent().reflectHori()
     
     def rotateRight(self):
         """
-        Rotates the current image left by 90 degrees.
+        Rotates the current image right by 90 degrees.
         
-        Technically, we can implement this via a transpose followed by a vertical
-        reflection. However, this is slow, so we use the faster strategy below.
+        Technically, this is a transpose followed by a horizontal reflection.  Like
+        transpose, it only changes the orientation of the image.
         """
-        current  = self.getCurrent()
-        original = current.copy()
-        current.setWidth(current.getHeight())
-        
-        for row in range(current.getHeight()):
-            for col in range(current.getWidth()):
-                current.setPixel(row,col,original.getPixel(original.getHeight()-col-1,row))
+        self.getCurrent().rotateRight()
     
     def rotateLeft(self):
         """
         Rotates the current image left by 90 degrees.
         
-        Technically, we can implement this via a transpose followed by a vertical
-        reflection. However, this is slow, so we use the faster strategy below.
+        Technically, this is a transpose followed by a vertical reflection.  Like
+        transpose, it only changes the orientation of the image.
         """
-        current  = self.getCurrent()
-        original = current.copy()
-        current.setWidth(current.getHeight())
-        
-        for row in range(current.getHeight()):
-            for col in range(current.getWidth()):
-                current.setPixel(row,col,original.getPixel(col,original.getWidth()-row-1))
+        self.getCurrent().rotateLeft()
     
     
     # ASSIGNMENT METHODS (IMPLEMENT THESE)
     def reflectVert(self):
         """ 
         Reflects the current image around the vertical middle.
+        
+        Like transpose, this only changes the orientation of the image.
         """
-        current = self.getCurrent()
-        for n in range(current.getHeight()//2):
-            for col in range(current.getWidth()):
-                x=current.getHeight()-1-n
-                current.swapPixels(n,col,x,col)
+        self.getCurrent().reflectVert()
     
     def monochromify(self, sepia):
         """
@@ -134,20 +111,28 @@ class Editor(a6history.ImageHistory):
         Precondition: sepia is a bool
         """
         assert isinstance(sepia,bool)
-        current=self.getCurrent()
-        for pos in range(current.getLength()):
-            rgb=current.getFlatPixel(pos)
-            brightness=rgb[0]*0.3+0.6*rgb[1]+0.1*rgb[2]
-            red=int(round(brightness))
-            if sepia==False:
-                green=red
-                blue=red
-            else:
-                green=int(round(brightness*0.6))
-                blue=int(round(brightness*0.4))
-            rgb=(red,green,blue)
-            current.setFlatPixel(pos,rgb)
-            
+        scales=(1,0.6,0.4) if sepia else (1,1,1)
+        lut.mix(self.getCurrent(),(0.3,0.6,0.1),scales) #brightness from per-channel tables
+    
+    def curve(self, red, green=None, blue=None):
+        """
+        Applies a tone curve to the current image.
+        
+        A curve is a lookup table from the module lut, such as lut.gamma(2.2), 
+        lut.levels(16,235) or lut.contrast(1.5).  Use lut.compose to combine several
+        curves into one.  If green or blue is None, that channel uses the red curve.
+        
+        Parameter red: The curve for the red channel
+        Precondition: red is a bytes object of length 256
+        
+        Parameter green: The curve for the green channel
+        Precondition: green is None or a bytes object of length 256
+        
+        Parameter blue: The curve for the blue channel
+        Precondition: blue is None or a bytes object of length 256
+        """
+        lut.apply(self.getCurrent(),red,green,blue)
+    
     
     def jail(self):
         """
@@ -185,21 +170,15 @@ class Editor(a6history.ImageHistory):
             1 - (d / hfD)^2
         
         where d is the distance from the pixel to the center of the image and hfD 
-        (for half diagonal) is the distance from the center of the image to any of 
+        (for half diagonal) is the distance from the center of the image to any of
         the corners.
+        
+        The factors only depend on the image size, so they come from a cached mask (see
+        the module masks) and are applied to the whole image at once.
         """
         current=self.getCurrent()
-        hfD=((current.getWidth()/2)**2+ (current.getHeight()/2)**2)  #constant- don't put in loop
-        for row in range(current.getHeight()):
-            for col in range(current.getWidth()):
-                #print('Starting row ' + str(row) +', column ' + str(col))
-                d=((row-(current.getHeight()/2))**2+
-                    (col-(current.getWidth()/2))**2) #get d
-                value=1-(d)/(hfD)
-                p=current.getPixel(row,col)
-                np=(round(value*p[0]), round(value*p[1]), round(value*p[2]))
-                #round at end for accuracy                   
-                current.setPixel(row,col,np)
+        mask=masks.vignette(current.getWidth(),current.getHeight())
+        masks.apply(current,mask)
     
     def pixellate(self,step):
         """
@@ -218,6 +197,9 @@ class Editor(a6history.ImageHistory):
         """
         assert isinstance(step,int) and step>0
         current=self.getCurrent()
+        #averages come from an unmodified copy, so its cached summed-area table
+        #(see Image.regionMean) stays valid while we write to the current image
+        original=current.copy()
         for row in range(math.ceil(current.getHeight()/step)): #number of times to iterate
             x=row*step                                         #is height and width divided
             x1=x+step                                          #by step- always rounds up to
@@ -228,10 +210,8 @@ class Editor(a6history.ImageHistory):
                 y1=y+step
                 if y1>current.getWidth():
                     y1=current.getWidth()
-                pos1, pos2=(x,y), (x1,y1)
-                p=self._avg_color(pos1,pos2)
-                [current.setPixel(b,a,p) for a in range(pos1[1],pos2[1]) for b
-                 in range(pos1[0], pos2[0])]  #learned from Python API while trying to make function run faster
+                p=original.regionMean((x,y,x1-x,y1-y))
+                current.fillRect(x,y,x1-x,y1-y,p) #one bulk write per block
     
     def encode(self, text):
         """
@@ -305,10 +285,7 @@ class Editor(a6history.ImageHistory):
         Precondition: pixel is a 3-element tuple (r,g,b) where each value is 0..255
         """
         current = self.getCurrent()
-        for col in range(current.getWidth()):
-            current.setPixel(row,   col, pixel)
-            current.setPixel(row+1, col, pixel)
-            current.setPixel(row+2, col, pixel)
+        current.fillRect(row, 0, 3, current.getWidth(), pixel)
 
     def _drawVBar(self, col, pixel):
         """
@@ -325,57 +302,8 @@ class Editor(a6history.ImageHistory):
         Precondition: pixel is a 3-element tuple (r,g,b) where each value is 0..255
         """
         current = self.getCurrent()
-        for row in range(current.getHeight()):
-            current.setPixel(row,   col, pixel)
-            current.setPixel(row, col+1, pixel)
-            current.setPixel(row, col+2, pixel)
-            current.setPixel(row, col+3, pixel)
+        current.fillRect(0, col, current.getHeight(), 4, pixel)
             
-    def _avg_color(self,pos1,pos2):
-        """
-        Returns: the average pixel color for pixels between posl 1 and pos 2.
-        
-        This function returns a tuple representing the average red, green, and blue
-        values of the pixels in the rangeobtained by summing each individual
-        value and dividing by the number of pixels.
-        
-        Parameter pos1: The upper-left corner of the range.
-        Precondition: pos1 is a tuple representing the row and column of a pixel
-        object.
-        Parameter pos2: The lower-right corner of the range.
-        Precondition: pos2 is a tuple representing the row and column of a pixel
-        object with both row and column greater than or equal to the row and column
-        of pos1, respectively.
-        """
-        reds,greens,blues=0,0,0 #accumulators
-        dx, dy, current = pos2[0]-pos1[0], pos2[1]-pos1[1], self.getCurrent()
-        if dx==0 and dy==0:  #make sure that there are no errors if we end up
-            return(pos1[0],pos1[1])              #with exactly one pixel left   
-        elif dx==0 or dy==0:
-            n=dy+dx   #if one and only one is zero, set n equal to the other (one row or column overflow)
-        else:
-            n=dx*dy
-        for x in range(pos1[0],pos2[0]):    #sums all RGB values
-            for y in range(pos1[1],pos2[1]):
-                p=current.getPixel(x,y)
-                reds=reds+p[0]
-                greens=greens+p[1]
-                blues=blues+p[2]
-        #taking care of edge cases
-        if dx==0:
-            for y in range(pos1[1],pos2[1]):
-                p=current.getPixel(pos1[0],y)
-                reds=reds+p[0]
-                greens=greens+p[1]
-                blues=blues+p[2]
-        if dy==0:
-            for x in range(pos1[0],pos2[0]):
-                p=current.getPixel(x,pos2[1])
-                reds=reds+p[0]
-                greens=greens+p[1]
-                blues=blues+p[2]
-        return (round(reds/n),round(greens/n),round(blues/n))
-
     def _decode_pixel(self, pos):
         """
         Returns: the number n that is hidden in pixel pos of the current image.
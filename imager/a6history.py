@@ -11,6 +11,8 @@ Author: Walker White (wmw2), Philip Cipollina(pjc272), Luke Marcinkiewicz(lam365
 Date:   October 20, 2017, November 16, 2017 (Assignment)
 """
 import a6image
+import pixels
+import threading
 
 class ImageHistory(object):
     """
@@ -20,9 +22,36 @@ class ImageHistory(object):
     The attribute _history stores all of the edits (up to a maximum of MAX_HISTORY edits)
     in order.  So the last element of _history is the most recent edit.
     
+    To save memory, the older edits are not stored in full.  Once an edit is finished
+    (when the next one starts), its pixel list is stored as a delta from the edit 
+    before it: only the pixels that the edit changed are kept (see Pixels.makedelta).
+    The changes come from the change tracking of the pixel list.  Every KEYFRAME-th
+    edit is kept in full, so that rebuilding an edit on undo never has to go through 
+    more than KEYFRAME-1 deltas.  These keyframes are split into tiles, which are kept
+    in a content-addressed store (see Pixels.dedupe).  Consecutive keyframes are 
+    usually mostly the same, so they share most of their tiles.  (The first edit does 
+    not need this, as it shares its pixels with the original image until modified.)
+        
+    The memory for the pixels of the history is limited to MAX_BYTES.  When the edits
+    use more than that, the oldest ones are spilled to compressed files on disk (see
+    Pixels.spill).  They are read back automatically when they are needed again, like
+    after an undo.  The method getStats reports how much is in memory and on disk.
+    Finished edits do not track changes, so they do not keep change markers.
+    
+    Most edits sit idle once they are finished.  A background thread compresses those
+    that are still stored in full, like edits that changed too much for a delta.  An
+    edit that shares its pixels (like the first edit, with the original image) is left
+    alone, as packing it would not save memory (see Pixels.pack).  It also spills the edits when they go over MAX_BYTES.  So the edit
+    methods never wait for compression.  An edit is decompressed when undo makes it 
+    current again.
+                
     IMMUTABLE ATTRIBUTES (Fixed after initialization)
         _original: The original image [Image object]
         _history:  The edit history   [non-empty list of Image objects]
+        _tiles:    The store for the tiles of the keyframes [TileStore]
+        _lock:     The lock for changing the edits [RLock]
+        _worker:   The thread that packs idle edits, if running [Thread or None]
+        _recheck:  Whether the edits may be over MAX_BYTES [bool]
     In addition, the length of _history should never be longer than the class attribute 
     MAX_HISTORY.
     """
@@ -31,6 +60,15 @@ class ImageHistory(object):
     # (THIS GOES IN CLASS FOLDER)
     MAX_HISTORY = 20
     
+    # The most bytes of pixel data that the edits may keep in memory
+    MAX_BYTES = 256*1024*1024
+    
+    # How often an edit is kept in full instead of as a delta
+    KEYFRAME = 5
+    
+    # Whether idle edits are compressed in memory by a background thread
+    BACKGROUND = True
+    
     # GETTERS
     def getOriginal(self):
         """
@@ -44,6 +82,31 @@ class ImageHistory(object):
         """
         return self._history[-1]
     
+    def getStats(self):
+        """
+        Returns: A dictionary of statistics about the storage of the edit history
+        
+        The dictionary has the keys 'edits' (the number of edits), 'resident' (the bytes
+        of pixel data in memory), 'spilled' (the bytes of compressed pixel data on disk),
+        'files' (the number of edits spilled to disk), 'packed' (the number of edits
+        compressed in memory) and 'tiles' (the number of distinct tiles of keyframes).
+        Pixel data shared between edits is only counted once.
+        """
+        seen = set()
+        resident = 0
+        spilled  = 0
+        files  = 0
+        packed = 0
+        with self._lock:
+            for image in self._images():
+                (memory,disk) = image._pixels.footprint(seen)
+                resident += memory
+                spilled  += disk
+                files  += image._pixels.isspilled()
+                packed += image._pixels.ispacked()
+        return {'edits':len(self._history),'resident':resident,'spilled':spilled,
+                'files':files,'packed':packed,'tiles':len(self._tiles)}
+        
     # INITIALIZER
     def __init__(self,original):
         """
@@ -58,6 +121,10 @@ class ImageHistory(object):
         assert isinstance(original,a6image.Image)
         self._original=original
         self._history=[original.copy()]
+        self._tiles=pixels.TileStore()
+        self._lock=threading.RLock()
+        self._worker=None
+        self._recheck=False
     
     # EDIT METHODS
     def undo(self):
@@ -68,12 +135,20 @@ class ImageHistory(object):
         of the edit history.  However, the invariant of _history specifies that the
         list can never be empty.  So in that case, it does not remove anything and
         returns False instead.
+        
+        The previous edit becomes the one being edited.  So it is rebuilt in full (if it
+        was stored as a delta, spilled or packed), and it tracks changes again.
         """
-        if len(self._history)==1:
-            return False
-        else:
-            self=self._history.pop()
-            return True
+        with self._lock:
+            if len(self._history)==1:
+                return False
+            else:
+                self._history.pop()
+                data = self.getCurrent()._pixels
+                data.unpack()
+                if not data.tracking and data.TRACK_CHANGES:
+                    data.tracking = True
+                return True
     
     def clear(self):
         """
@@ -82,8 +157,8 @@ class ImageHistory(object):
         When this method completes, the object should have the same values that it did
         when it was first initialized.
         """
-        self._history=[self.getOriginal().copy()]
-        self=self.getOriginal()
+        with self._lock:
+            self._history=[self.getOriginal().copy()]
     
     def increment(self):
         """
@@ -93,9 +168,124 @@ class ImageHistory(object):
         history. This provides a new image for editing, while the previous edit is
         preserved. If this method causes the history to grow to larger (greater than 
         MAX_HISTORY), this method deletes the oldest edit to ensure the invariant is 
-        satisfied.
+        satisfied.  If the edits use more than MAX_BYTES of memory, the oldest ones are
+        spilled to disk.  The idle edits are then compressed.  Both of these happen in 
+        the background if BACKGROUND is True.
         """
-        if len(self._history)>=ImageHistory.MAX_HISTORY:
-            del self._history[0]
-        self._history=self._history + [self.getCurrent().copy()]
-
+        with self._lock:
+            if len(self._history)>=ImageHistory.MAX_HISTORY:
+                del self._history[0]
+            self._history=self._history + [self.getCurrent().copy()]
+            self._store()
+            if not self.BACKGROUND:
+                self._spill()
+                return
+            self._recheck = True
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work,daemon=True)
+                self._worker.start()
+    
+    # HELPER METHODS
+    def _images(self):
+        """
+        Returns: The images whose pixels are kept by this history (counted by getStats)
+        """
+        return self._history
+    
+    def _store(self):
+        """
+        Stores the edit before the current one as a delta, unless it is a keyframe.
+        
+        That edit was made as a copy of the edit before it, so its changes since the
+        copy are exactly the difference between the two.  It is a keyframe if the
+        KEYFRAME-1 edits before it are all deltas, and then it is stored as tiles.  If
+        it changed too much to make a delta worthwhile, it is left as it is, but it 
+        stops tracking changes (undo starts tracking again).
+        """
+        if len(self._history) < 2:
+            return
+        image = self._history[-2]
+        data  = image._pixels
+        if len(self._history) < 3:
+            data.tracking = False
+            return
+        base  = self._history[-3]._pixels
+        chain = 0
+        for entry in reversed(self._history[:-2]):
+            if not entry._pixels.isdelta():
+                break
+            chain += 1
+        if chain+1 < self.KEYFRAME:
+            data.makedelta(base,data.changes())
+        else:
+            # The pixel list holds the rows of the image as it was before any rotation
+            width = image.getWidth() if abs(image._cstride) == 1 else image.getHeight()
+            data.dedupe(self._tiles,width)
+        if data.tracking:
+            data.tracking = False
+    
+    def _spill(self):
+        """
+        Spills the oldest edits to disk until the edits fit in MAX_BYTES of memory.
+        
+        The current edit always stays in memory.  The memory in use is only computed 
+        once, and then reduced by the memory that each spill frees (see 
+        Pixels.exclusive).  An edit that frees nothing is skipped, like one that the 
+        next edit is a delta of.  Its memory is freed once the edits that use it are 
+        spilled, so this takes a few passes over the edits (at most KEYFRAME).
+        
+        The lock is not held while an edit is compressed, so this can run in the 
+        background thread (see Pixels.spill).
+        """
+        with self._lock:
+            total = self.getStats()['resident']
+        while total > self.MAX_BYTES:
+            freed = 0
+            with self._lock:
+                images = self._history[:-1]
+            for image in images:
+                if total <= self.MAX_BYTES:
+                    return
+                data = image._pixels
+                with self._lock:
+                    size = data.exclusive() if image is not self.getCurrent() else 0
+                if size and data.spill(self._lock):
+                    total -= size
+                    freed += size
+            if not freed:
+                return
+    
+    def _work(self):
+        """
+        Packs the idle edits, oldest first, and then spills them if they are over 
+        MAX_BYTES, until there is nothing left to do.
+        
+        This runs in the background thread.  An edit is idle if it is not the current
+        one and it is still stored in full.  Packing comes first, as it frees memory 
+        without going to disk, and a packed edit is spilled without compressing it 
+        again.  The lock is only held to pick an edit and to swap in its compressed 
+        pixels, so compressing never blocks the edit methods.  Each edit is only tried
+        once, as packing it is abandoned if it changes.
+        """
+        tried = set()
+        while True:
+            with self._lock:
+                data = None
+                for image in self._history[:-1]:
+                    entry  = image._pixels
+                    stored = entry.isdelta() or entry.isspilled() or entry.ispacked()
+                    stored = stored or entry.isdeduped()
+                    if not stored and id(entry) not in tried:
+                        data = entry
+                        break
+                if data is None:
+                    if not self._recheck:
+                        self._worker = None
+                        return
+                    self._recheck = False
+                else:
+                    tried.add(id(data))
+            if data is None:
+                self._spill()
+            else:
+                data.pack(self._lock)
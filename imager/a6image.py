@@ -9,6 +9,9 @@ Based on an original file by Dexter Kozen (dck10) and Walker White (wmw2)
 Author: Walker M. White (wmw2), Philip Cipollina(pjc272), Luke Marcinkiewicz(lam365)
 Date:    October 20, 2017 (Python 3 Version), November 16, 2017 (Assignment)
 """
+from array import array             # Summed-area tables
+from itertools import accumulate    # Running sums for summed-area tables
+from operator import add
 import pixels   # So we can manipulate pixel data
 
 class Image(object):
@@ -27,23 +30,59 @@ class Image(object):
     If you want to treat the image like a 1D list you use the methods `getFlatPixel` and
     `setFlatPixel`.  These methods are used by the steganography methods.
     
+    An image can also be a view of a rectangle in another image (see the method view).
+    A view shares the pixel list of the other image, and finds its pixels with the
+    attributes _offset, _rstride and _cstride: the pixel at (row, col) is at position
+    _offset+row*_rstride+col*_cstride of the pixel list.  For an ordinary image, these
+    are 0, width and 1.
+    
+    The same attributes let an image be transposed, reflected or rotated without moving
+    any pixels (see the method transpose).  The pixels are put back in row-major order
+    (see the method materialize) only when something needs them that way.
+    
     IMMUTABLE ATTRIBUTES (Fixed after initialization)
-        _pixels: The underlying list of pixels      [Pixel object]
-        _length: The number of pixels in the list   [int >= 0]
+        _pixels:  The underlying list of pixels      [Pixel object]
+        _length:  The number of pixels in the image  [int >= 0]
+        _view:    Whether this image is a view of another image [bool]
     
     MUTABLE ATTRIBUTES (Can be changed at any time)
         _width:  The image width, which is the number of columns [int > 0]
         _height: The image height, which is the number of rows   [int > 0]
+        _offset:  The position of the top left pixel in the pixel list [int >= 0]
+        _rstride: The distance between rows in the pixel list    [int != 0]
+        _cstride: The distance between columns in the pixel list [int != 0]
+        _flat:    Whether pixel n of the image is position n of the pixel list [bool]
+        _reoriented: Whether the image was reoriented since popDirtyRows [bool]
     There is an additional invariant that width*height == length at all times.  So
     if you change width, you must change height.
     """
+    
+    # The most bytes of pixels in a band (see the method bands)
+    BAND_BYTES = 4*1024*1024
 
     # IMMUTABLE ATTRIBUTES
     def getPixels(self):
         """
         Returns: the pixel list for this image
         
-        This pixel list is used by the GUI to display the image.
+        This pixel list is used by the GUI to display the image.  If this image is a view,
+        the result is a new pixel list with a copy of the pixels in the view.  If this
+        image was reoriented, it is materialized first.
+        """
+        if self._view:
+            data = self.getRect(0,0,self._height,self._width)
+            return pixels.Pixels.frombuffer(data)
+        self.materialize()
+        return self._pixels
+    
+    def getPixelList(self):
+        """
+        Returns: the pixel list of this image, exactly as it is stored
+        
+        Unlike getPixels, this never copies or materializes anything.  So it is safe to
+        call while another thread is editing this image (to check its progress, say).  
+        If this image was reoriented (or is a view), the pixel list is not in the order 
+        of the pixels of this image.
         """
         return self._pixels
 
@@ -70,13 +109,19 @@ class Image(object):
         The value is valid if it evenly divides the number of pixels in the image.
         So if the pixel list has 10 pixels, a valid width is 1, 2, 5, or 10.
         
+        The width of a view cannot be changed.
+        
         Parameter value: the new width value
         Precondition: width is an int > 0 and evenly divides the length of pixels
         """
         assert isinstance(value, int) and value>0, 'value is not an int>0'
         assert self._length%value==0, 'length is not evenly divisible by value'
+        assert not self._view, 'the width of a view cannot be changed'
+        self.materialize() #the new rows have to come from row-major order
         self._width=value
         self._height=self._length//self._width
+        self._rstride=value
+        self._flat=True
         
     
     def getHeight(self):
@@ -127,6 +172,11 @@ class Image(object):
         assert len(data)%width==0, 'data length is not evenly divisible by width'
         self._pixels=data
         self._length=len(data)
+        self._view=False
+        self._offset=0
+        self._cstride=1
+        self._flat=True
+        self._reoriented=False
         self.setWidth(width) #sets both width and height due to nature of method
         
     
@@ -151,10 +201,10 @@ class Image(object):
         s='[' #accumulator
         #runs height number of times because list has height many objects
         for _ in range (self.getHeight()): 
-            #gets width many pixels by starting at width*iteration and going
-            #width many down the list- prevents overlap- then converts list
-            #to a string which includes brackets
-            s=s+str(self._pixels[(_)*self.getWidth():(_+1)*self.getWidth()])  
+            #gets the row as raw bytes and wraps it in a pixel list (without
+            #copying it or building tuples)- then converts list to a string 
+            #which includes brackets
+            s=s+str(pixels.Pixels.frombuffer(self.getRow(_)))
             if _==self.getHeight()-1: #if final element, end list with bracket
                 s=s+']'
             #otherwise add a double space and comma between elements
@@ -230,8 +280,13 @@ class Image(object):
         Precondition: n is an int >= 0 and < length (of the pixel list)
         
         NOTE: DO NOT enforce any preconditions.  List the pixel list handle this for you.
+        (A view does enforce them, as its pixel list is larger than the view.)
         """
-        return self.getPixels()[n]
+        if not self._flat:
+            if self._view:
+                return self._pixels[self._position(n)]
+            self.materialize()
+        return self._pixels[n]
 
     def setFlatPixel(self, n, pixel):
         """
@@ -250,9 +305,402 @@ class Image(object):
         Precondition: pixel is a 3-element tuple (r,g,b) where each value is 0..255
         
         NOTE: DO NOT enforce any preconditions.  List the pixel list handle this for you.
+        (A view does enforce them, as its pixel list is larger than the view.)
         """
+        if not self._flat:
+            if self._view:
+                self._pixels[self._position(n)]=pixel
+                return
+            self.materialize()
         self._pixels[n]=pixel
     
+    # BULK ACCESS METHODS
+    def getRow(self, row):
+        """
+        Returns: The pixels of the given row as raw bytes
+        
+        The bytes are packed RGB, so the result has 3*width bytes.  Use this instead of
+        getPixel when you need a whole row, as it does not create a tuple per pixel.
+        
+        Parameter row: The pixel row
+        Precondition: row is an int >= 0 and < height
+        """
+        assert isinstance(row,int) and row>=0, 'row is not an int >=0'
+        assert row<self.getHeight(), 'row is not less than height'
+        return self._pixels.getspan(self._index(row,0),self._width,self._cstride)
+    
+    def setRow(self, row, data):
+        """
+        Sets the pixels of the given row from raw bytes
+        
+        Parameter row: The pixel row
+        Precondition: row is an int >= 0 and < height
+        
+        Parameter data: The new row contents as packed RGB
+        Precondition: data is a bytes-like object with 3*width bytes
+        """
+        assert isinstance(row,int) and row>=0, 'row is not an int >=0'
+        assert row<self.getHeight(), 'row is not less than height'
+        assert len(data)==3*self._width, 'data is not 3*width bytes'
+        self._pixels.setspan(self._index(row,0),data,self._cstride)
+    
+    def getColumn(self, col):
+        """
+        Returns: The pixels of the given column (top to bottom) as raw bytes
+        
+        The bytes are packed RGB, so the result has 3*height bytes.
+        
+        Parameter col: The pixel column
+        Precondition: col is an int >= 0 and < width
+        """
+        assert isinstance(col,int) and col>=0, 'col is not an int >=0'
+        assert col<self.getWidth(), 'col is not less than width'
+        return self._pixels.getspan(self._index(0,col),self._height,self._rstride)
+    
+    def setColumn(self, col, data):
+        """
+        Sets the pixels of the given column (top to bottom) from raw bytes
+        
+        Parameter col: The pixel column
+        Precondition: col is an int >= 0 and < width
+        
+        Parameter data: The new column contents as packed RGB
+        Precondition: data is a bytes-like object with 3*height bytes
+        """
+        assert isinstance(col,int) and col>=0, 'col is not an int >=0'
+        assert col<self.getWidth(), 'col is not less than width'
+        assert len(data)==3*self._height, 'data is not 3*height bytes'
+        self._pixels.setspan(self._index(0,col),data,self._rstride)
+    
+    def getRect(self, row, col, height, width):
+        """
+        Returns: The pixels of the given rectangle as raw bytes
+        
+        The rectangle has its top left corner at (row, col).  The bytes are packed RGB 
+        in row-major order, so the result has 3*width*height bytes.
+        
+        Parameter row: The top row of the rectangle
+        Precondition: row is an int >= 0 and < height of the image
+        
+        Parameter col: The left column of the rectangle
+        Precondition: col is an int >= 0 and < width of the image
+        
+        Parameter height: The number of rows in the rectangle
+        Precondition: height is an int >= 0 and row+height <= height of the image
+        
+        Parameter width: The number of columns in the rectangle
+        Precondition: width is an int >= 0 and col+width <= width of the image
+        """
+        self._checkRect(row,col,height,width)
+        if self._cstride == 1 and self._rstride == width:
+            return self._pixels.getspan(self._index(row,col),height*width)
+        step  = self._cstride
+        spans = [self._pixels.getspan(self._index(r,col),width,step) for r in range(row,row+height)]
+        return b''.join(spans)
+    
+    def setRect(self, row, col, height, width, data):
+        """
+        Sets the pixels of the given rectangle from raw bytes
+        
+        This is the inverse of getRect.
+        
+        Parameter row: The top row of the rectangle
+        Precondition: row is an int >= 0 and < height of the image
+        
+        Parameter col: The left column of the rectangle
+        Precondition: col is an int >= 0 and < width of the image
+        
+        Parameter height: The number of rows in the rectangle
+        Precondition: height is an int >= 0 and row+height <= height of the image
+        
+        Parameter width: The number of columns in the rectangle
+        Precondition: width is an int >= 0 and col+width <= width of the image
+        
+        Parameter data: The new rectangle contents as packed RGB in row-major order
+        Precondition: data is a bytes-like object with 3*width*height bytes
+        """
+        self._checkRect(row,col,height,width)
+        assert len(data)==3*width*height, 'data is not 3*width*height bytes'
+        if self._cstride == 1 and self._rstride == width:
+            self._pixels.setspan(self._index(row,col),data)
+            return
+        data = memoryview(data).cast('B')
+        for r in range(height):
+            span = data[r*width*3:(r+1)*width*3]
+            self._pixels.setspan(self._index(row+r,col),span,self._cstride)
+    
+    def fillRect(self, row, col, height, width, pixel):
+        """
+        Sets all of the pixels in the given rectangle to pixel
+        
+        Parameter row: The top row of the rectangle
+        Precondition: row is an int >= 0 and < height of the image
+        
+        Parameter col: The left column of the rectangle
+        Precondition: col is an int >= 0 and < width of the image
+        
+        Parameter height: The number of rows in the rectangle
+        Precondition: height is an int >= 0 and row+height <= height of the image
+        
+        Parameter width: The number of columns in the rectangle
+        Precondition: width is an int >= 0 and col+width <= width of the image
+        
+        Parameter pixel: The pixel value
+        Precondition: pixel is a 3-element tuple (r,g,b) where each value is 0..255
+        """
+        self._checkRect(row,col,height,width)
+        if self._cstride == 1 and self._rstride == width:
+            self._pixels.fillspan(self._index(row,col),height*width,pixel)
+        elif self._cstride == 1:
+            for r in range(row,row+height):
+                self._pixels.fillspan(self._index(r,col),width,pixel)
+        else:
+            span = bytes(pixel)*width
+            for r in range(row,row+height):
+                self._pixels.setspan(self._index(r,col),span,self._cstride)
+    
+    def getChannel(self, channel):
+        """
+        Returns: The values of a single color channel as bytes, in row-major order
+        
+        Channel 0 is red, 1 is green and 2 is blue.  The result has one byte per pixel.
+        
+        Parameter channel: The color channel
+        Precondition: channel is 0, 1, or 2
+        """
+        if self._flat:
+            return self._pixels.getchannel(channel)
+        assert channel in (0,1,2), repr(channel)+' is not a valid channel'
+        return self.getRect(0,0,self._height,self._width)[channel::3]
+    
+    def setChannel(self, channel, data):
+        """
+        Sets the values of a single color channel from bytes, in row-major order
+        
+        Parameter channel: The color channel
+        Precondition: channel is 0, 1, or 2
+        
+        Parameter data: The new channel values, one byte per pixel
+        Precondition: data is a bytes-like object with length bytes
+        """
+        if self._flat:
+            self._pixels.setchannel(channel,data)
+            return
+        assert channel in (0,1,2), repr(channel)+' is not a valid channel'
+        assert len(data)==self._length, 'data is not length bytes'
+        contents = bytearray(self.getRect(0,0,self._height,self._width))
+        contents[channel::3] = data
+        self.setRect(0,0,self._height,self._width,contents)
+    
+    def regionMean(self, rect):
+        """
+        Returns: The average color of the given rectangle, as a pixel
+        
+        Each color value is the average of that channel over the rectangle, rounded to
+        the nearest int.  This uses a summed-area table (an integral image) for each 
+        channel, so it takes the same time for any size of rectangle.  The tables are
+        computed once and cached with the pixel list, so they are also used by any 
+        unmodified copy of this image (like the ones in the edit history).
+        
+        Parameter rect: The rectangle as (row, col, height, width)
+        Precondition: rect is a 4-element tuple, as for getRect, with height, width > 0
+        """
+        row, col, height, width = rect
+        self._checkRect(row,col,height,width)
+        assert height>0 and width>0, 'the rectangle is empty'
+        stride = self._width+1
+        top    = row*stride+col
+        bottom = (row+height)*stride+col
+        count  = height*width
+        result = []
+        for table in self._integral():
+            total = table[bottom+width]-table[top+width]-table[bottom]+table[top]
+            result.append(round(total/count))
+        return tuple(result)
+    
+    def popDirtyRows(self):
+        """
+        Returns: The ranges of rows modified since the last call, as (start,stop) pairs
+        
+        Each pair includes the rows start..stop-1.  The ranges are sorted and do not
+        overlap.  They include every row with a pixel that was modified since the last 
+        call (or since this image was created or copied), but they may include some 
+        unmodified rows as well.  The GUI uses this to redraw only what changed.
+        
+        If the pixel list is not tracking changes, this returns None.  It also returns None
+        for a view, since the changes belong to the image that owns the pixel list.  If
+        the image was reoriented, every row counts as modified.
+        """
+        if self._view:
+            return None
+        reoriented = self._reoriented
+        self._reoriented = False
+        spans = self._pixels.popdirty()
+        if spans is None:
+            return None
+        if reoriented or (spans and not self._flat):
+            return [(0,self._height)]
+        rows = []
+        for (start,stop) in spans:
+            first = start//self._width
+            last  = (stop-1)//self._width+1
+            if rows and first <= rows[-1][1]:
+                rows[-1] = (rows[-1][0],max(last,rows[-1][1]))
+            else:
+                rows.append((first,last))
+        return rows
+    
+    def tiles(self, size=64):
+        """
+        Returns: An iterator over the tiles of this image, as rectangles
+        
+        Each tile is a tuple (row, col, height, width) suitable for getRect, setRect and 
+        fillRect.  The tiles are square blocks (smaller at the right and bottom edges) 
+        that cover the image exactly once, in row-major order.  Working one tile at a 
+        time keeps 2D operations in a small part of memory.
+        
+        Parameter size: The width (and height) of a tile
+        Precondition: size is an int > 0
+        """
+        assert isinstance(size,int) and size>0, 'size is not an int > 0'
+        for row in range(0,self._height,size):
+            for col in range(0,self._width,size):
+                yield (row,col,min(size,self._height-row),min(size,self._width-col))
+    
+    def bands(self):
+        """
+        Returns: An iterator over the bands of this image, as rectangles
+        
+        Each band is a tuple (row, 0, height, width) suitable for getRect, setRect and 
+        fillRect.  The bands are groups of whole rows, of at most BAND_BYTES bytes (but 
+        at least one row), that cover the image exactly once from top to bottom.  Filters
+        that work one band at a time never hold a full copy of the image, so they work
+        on images that do not fit in memory (like a MappedPixels panorama).
+        """
+        rows = max(1,self.BAND_BYTES//(3*self._width))
+        for row in range(0,self._height,rows):
+            yield (row,0,min(rows,self._height-row),self._width)
+    
+    def view(self, row, col, height, width):
+        """
+        Returns: A view of the given rectangle of this image
+        
+        A view is an Image that uses the same pixel list as this image.  No pixels are
+        copied: reading a pixel of the view reads this image, and setting a pixel of the
+        view sets this image.  Pixel (0,0) of the view is pixel (row,col) of this image.
+        This makes it possible to apply any image operation to part of an image.
+        
+        A view can have views of its own.  The width of a view cannot be changed, and
+        its getPixels method returns a copy of its pixels.  A view only follows this
+        image until this image is next transposed, reflected or rotated.
+        
+        Parameter row: The top row of the rectangle
+        Precondition: row is an int >= 0 and < height of the image
+        
+        Parameter col: The left column of the rectangle
+        Precondition: col is an int >= 0 and < width of the image
+        
+        Parameter height: The number of rows in the rectangle
+        Precondition: height is an int > 0 and row+height <= height of the image
+        
+        Parameter width: The number of columns in the rectangle
+        Precondition: width is an int > 0 and col+width <= width of the image
+        """
+        self._checkRect(row,col,height,width)
+        assert height>0 and width>0, 'the rectangle is empty'
+        result = object.__new__(type(self))
+        result.__dict__.update(self.__dict__)
+        result._view=True
+        result._flat=False
+        result._offset=self._index(row,col)
+        result._length=height*width
+        result._width=width
+        result._height=height
+        return result
+    
+    def isView(self):
+        """
+        Returns: True if this image is a view of another image, False otherwise
+        """
+        return self._view
+    
+    def isFlat(self):
+        """
+        Returns: True if pixel n of this image is pixel n of its pixel list, False otherwise
+        
+        This is the case unless the image is a view, or was reoriented and has not been
+        materialized since.
+        """
+        return self._flat and not self._view
+    
+    # ORIENTATION METHODS
+    def transpose(self):
+        """
+        Transposes this image, so that its rows become its columns
+        
+        No pixels are moved.  Instead, the image changes how it finds its pixels in the
+        pixel list, so this takes the same (short) time for any image.  Any number of
+        transposes, reflections and rotations can be combined this way.  The pixels are
+        only rearranged by materialize, which happens automatically when needed.
+        
+        A view does move its pixels (since they belong to another image), and can only
+        be transposed if it is square.
+        """
+        self._reorient(True,False,False)
+    
+    def reflectHori(self):
+        """
+        Reflects this image around the vertical middle, reversing each row
+        
+        Like transpose, this does not move any pixels.
+        """
+        self._reorient(False,False,True)
+    
+    def reflectVert(self):
+        """
+        Reflects this image around the horizontal middle, reversing each column
+        
+        Like transpose, this does not move any pixels.
+        """
+        self._reorient(False,True,False)
+    
+    def rotateLeft(self):
+        """
+        Rotates this image left (counter-clockwise) by 90 degrees
+        
+        Like transpose, this does not move any pixels.  A view must be square.
+        """
+        self._reorient(True,True,False)
+    
+    def rotateRight(self):
+        """
+        Rotates this image right (clockwise) by 90 degrees
+        
+        Like transpose, this does not move any pixels.  A view must be square.
+        """
+        self._reorient(True,False,True)
+    
+    def materialize(self):
+        """
+        Rearranges the pixel list so that it is in row-major order for this image
+        
+        Once this is done, pixel n of the image is pixel n of the pixel list.  This copies
+        the image once, no matter how many times it was transposed, reflected or rotated.
+        It does nothing if the image was not reoriented.  It is called automatically by
+        getPixels (so before the image is drawn or saved), by setWidth, and by the flat
+        pixel methods (so before any filter that works one pixel at a time).
+        
+        A view is never materialized, since its pixels belong to another image.
+        """
+        if self._flat or self._view:
+            return
+        data = self.getRect(0,0,self._height,self._width)
+        self._pixels.setspan(0,data)
+        self._offset=0
+        self._rstride=self._width
+        self._cstride=1
+        self._flat=True
+    
     # ADDITIONAL METHODS
     def swapPixels(self, row1, col1, row2, col2):
         """
@@ -284,10 +732,131 @@ class Image(object):
         """
         Returns: A copy of this image object.
         
-        This method returns a new Image object. The underlying pixel data must be copied 
+        This method returns a new Image object. The underlying pixel data must be copied
         (e.g. the copy cannot refer to the same pixel list object that this file does).
+        The pixel list copy is copy-on-write, so this is fast until one of the images
+        is modified.  The copy keeps the orientation of this image (so it is not
+        materialized).  The copy of a view is an ordinary image.
+        """
+        if self._view:
+            return Image(self.getPixels(),self.getWidth())
+        #copy the attributes (including orientation) and then the pixel list
+        result=object.__new__(type(self))
+        result.__dict__.update(self.__dict__)
+        result._pixels=self._pixels.copy()
+        return result
+    
+    # HELPER METHODS
+    def _reorient(self, transpose, fliprows, flipcols):
+        """
+        Changes the orientation of this image
+        
+        The image is first transposed (if transpose is True), and then reflected.  This
+        only changes the attributes that find pixels in the pixel list, unless this
+        image is a view.  A view moves its pixels instead, with the help of a copy.
+        
+        Parameter transpose: Whether to swap rows and columns
+        Precondition: transpose is a bool (and if True, a view must be square)
+        
+        Parameter fliprows: Whether to reverse the order of the rows
+        Precondition: fliprows is a bool
+        
+        Parameter flipcols: Whether to reverse the order of the columns
+        Precondition: flipcols is a bool
+        """
+        if self._view:
+            assert not transpose or self._width==self._height, 'a view cannot change shape'
+            data = self.getRect(0,0,self._height,self._width)
+            temp = Image(pixels.Pixels.frombuffer(data),self._width)
+            temp._reorient(transpose,fliprows,flipcols)
+            self.setRect(0,0,self._height,self._width,temp.getRect(0,0,self._height,self._width))
+            return
+        if transpose:
+            self._rstride, self._cstride = self._cstride, self._rstride
+            self._width, self._height = self._height, self._width
+        if fliprows:
+            self._offset += (self._height-1)*self._rstride
+            self._rstride = -self._rstride
+        if flipcols:
+            self._offset += (self._width-1)*self._cstride
+            self._cstride = -self._cstride
+        self._flat = self._offset==0 and self._cstride==1 and self._rstride==self._width
+        self._reoriented = True
+    
+    def _integral(self):
+        """
+        Returns: The summed-area tables of this image, one per channel
+        
+        Entry r*(width+1)+c of a table is the sum of that channel over rows 0..r-1 and
+        columns 0..c-1.  The tables are arrays of 64-bit ints.  They are cached with the
+        pixel list (for the current orientation), and only computed if not cached.
         """
-        #copy pixel list
-        data=self.getPixels()[:]
-        #create new image with same list and a copy of the same pixel list
-        return Image(data,self.getWidth())
+        key = ('integral',self._offset,self._rstride,self._cstride,self._width,self._height)
+        tables = self._pixels.getcached(key)
+        if not tables is None:
+            return tables
+        
+        stride = self._width+1
+        if pixels.numpy is None:
+            tables = [array('q',bytes(8*stride)) for _ in range(3)]
+            for row in range(self._height):
+                data = self.getRow(row)
+                for (channel,table) in enumerate(tables):
+                    above = table[-stride:]
+                    table.extend(map(add,above,accumulate(data[channel::3],initial=0)))
+        else:
+            numpy = pixels.numpy
+            data  = self.getRect(0,0,self._height,self._width)
+            data  = numpy.frombuffer(data,dtype=numpy.uint8).reshape(self._height,self._width,3)
+            sums  = numpy.zeros((self._height+1,stride,3),dtype=numpy.int64)
+            numpy.cumsum(data,axis=0,dtype=numpy.int64,out=sums[1:,1:])
+            numpy.cumsum(sums[1:,1:],axis=1,out=sums[1:,1:])
+            tables = [array('q',sums[:,:,channel].tobytes()) for channel in range(3)]
+        self._pixels.setcached(key,tables)
+        return tables
+    
+    def _index(self, row, col):
+        """
+        Returns: The position of the pixel at (row, col) in the pixel list
+        
+        Parameter row: The pixel row
+        Precondition: row is an int >= 0 and < height
+        
+        Parameter col: The pixel column
+        Precondition: col is an int >= 0 and < width
+        """
+        return self._offset+row*self._rstride+col*self._cstride
+    
+    def _position(self, n):
+        """
+        Returns: The position of pixel number n of the image in the pixel list
+        
+        Parameter n: The pixel number
+        Precondition: NONE (this method checks it)
+        """
+        assert isinstance(n,int) and 0<=n<self._length, repr(n)+' is not a valid pixel'
+        row, col = divmod(n,self._width)
+        return self._offset+row*self._rstride+col*self._cstride
+    
+    def _checkRect(self, row, col, height, width):
+        """
+        Enforces the preconditions for a rectangle in this image
+        
+        Parameter row: The top row of the rectangle
+        Precondition: NONE (this method checks it)
+        
+        Parameter col: The left column of the rectangle
+        Precondition: NONE (this method checks it)
+        
+        Parameter height: The number of rows in the rectangle
+        Precondition: NONE (this method checks it)
+        
+        Parameter width: The number of columns in the rectangle
+        Precondition: NONE (this method checks it)
+        """
+        assert isinstance(row,int) and row>=0, 'row is not an int >=0'
+        assert isinstance(col,int) and col>=0, 'col is not an int >=0'
+        assert isinstance(height,int) and height>=0, 'height is not an int >=0'
+        assert isinstance(width,int) and width>=0, 'width is not an int >=0'
+        assert row+height<=self.getHeight(), 'rectangle extends past the bottom'
+        assert col+width<=self.getWidth(), 'rectangle extends past the right edge'
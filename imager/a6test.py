@@ -37,6 +37,158 @@ def test_assert(func,args,message):
     return False
 
 
+def test_pixels_tracking():
+    """
+    Tests the change tracking (progress monitor) of the pixel list
+    """
+    print('Testing pixel list change tracking')
+    p = pixels.Pixels(4)
+    cornell.assert_equals(0,p.progress())
+    p[1] = (1,1,1)
+    p[1] = (2,2,2)
+    cornell.assert_equals(0.25,p.progress())
+    p.setspan(0,bytes(6))
+    cornell.assert_equals(0.5,p.progress())
+    p.fillspan(0,4,(0,0,0))
+    cornell.assert_equals(1.0,p.progress())
+    p.unmark()
+    cornell.assert_equals(0,p.progress())
+    
+    p.tracking = False
+    p[0] = (5,5,5)
+    cornell.assert_equals(0,p.progress())
+    cornell.assert_equals((5,5,5),p[0])
+    p.tracking = True
+    p[0] = (6,6,6)
+    cornell.assert_equals(0.25,p.progress())
+    
+    # Dirty spans
+    p = pixels.Pixels(20)
+    cornell.assert_equals([],p.popdirty())
+    p[3] = (1,1,1)
+    p[4] = (1,1,1)
+    p[10] = (1,1,1)
+    p.fillspan(5,2,(2,2,2))
+    cornell.assert_equals([(3,7),(10,11)],p.popdirty())
+    cornell.assert_equals([],p.popdirty())
+    p[7] = (1,1,1)
+    p.setspan(19,bytes(9),-5)
+    cornell.assert_equals([(7,8),(9,20)],p.popdirty())
+    p.MAX_DIRTY = 4
+    for pos in range(0,20,2):
+        p[pos] = (3,3,3)
+    spans = p.popdirty()
+    cornell.assert_true(len(spans) <= 4)
+    for pos in range(0,20,2):
+        cornell.assert_true(any(start <= pos < stop for (start,stop) in spans))
+    p.tracking = False
+    cornell.assert_equals(None,p.popdirty())
+    
+    pixels.Pixels.TRACK_CHANGES = False
+    try:
+        q = pixels.Pixels(4)
+        cornell.assert_false(q.tracking)
+        q.unmark()
+        cornell.assert_false(q.tracking)
+    finally:
+        pixels.Pixels.TRACK_CHANGES = True
+
+
+def test_pixels_mapped():
+    """
+    Tests the pixel list backed by a memory-mapped file
+    """
+    print('Testing mapped pixel list')
+    import os
+    import tempfile
+    import a6image
+    handle, filename = tempfile.mkstemp(suffix='.rgb')
+    os.close(handle)
+    try:
+        p = pixels.MappedPixels.create(filename,6)
+        cornell.assert_equals(6,len(p))
+        p[1] = (1,2,3)
+        image = a6image.Image(p,3)
+        image.setPixel(1,2,(4,5,6))
+        copy = image.copy()
+        copy.setPixel(0,0,(7,8,9))
+        cornell.assert_equals((0,0,0),image.getPixel(0,0))
+        p.close()
+        cornell.assert_equals((7,8,9),copy.getPixel(0,0))
+        
+        q = pixels.MappedPixels(filename,writeback=False)
+        cornell.assert_equals([(0,0,0),(1,2,3),(0,0,0),(0,0,0),(0,0,0),(4,5,6)],list(q))
+        q[0] = (1,1,1)
+        q.close()
+        
+        q = pixels.MappedPixels(filename,size=2,offset=3)
+        cornell.assert_equals([(1,2,3),(0,0,0)],list(q))
+        
+        # The last copy to close the mapping unmaps it
+        r = q.copy()
+        mapping = q._map
+        q.close()
+        cornell.assert_equals([(1,2,3),(0,0,0)],list(r))
+        cornell.assert_false(mapping.closed)
+        r.close()
+        cornell.assert_true(mapping.closed)
+    finally:
+        os.remove(filename)
+
+
+def _invert_band(image, start, stop):
+    """
+    Inverts the rows start..stop-1 of image (used by test_pixels_shared)
+    """
+    for row in range(start,stop):
+        image.setRow(row,bytes(255-x for x in image.getRow(row)))
+
+
+def test_pixels_shared():
+    """
+    Tests the pixel list in shared memory and multi-process bands
+    """
+    print('Testing shared pixel list')
+    import a6image
+    import parallel
+    p = pixels.SharedPixels(6)
+    p[0] = (1,2,3)
+    q = pixels.SharedPixels(6,p.name)
+    cornell.assert_equals((1,2,3),q[0])
+    q[5] = (4,5,6)
+    cornell.assert_equals((4,5,6),p[5])
+    
+    # The last copy to close the block detaches from it
+    r = q.copy()
+    q.close()
+    cornell.assert_equals((4,5,6),r[5])
+    cornell.assert_equals([1],r._owners)
+    r.close()
+    cornell.assert_true(r._memory.buf is None)
+    
+    cornell.assert_equals([(0,2),(2,4),(4,7)],parallel.bands(7,3))
+    cornell.assert_equals([(0,1),(1,2)],parallel.bands(2,4))
+    
+    image = a6image.Image(p,2)
+    copy  = image.copy()
+    parallel.run(_invert_band,image,processes=2)
+    cornell.assert_equals((254,253,252),image.getPixel(0,0))
+    cornell.assert_equals((251,250,249),image.getPixel(2,1))
+    cornell.assert_equals((1,2,3),copy.getPixel(0,0))
+    p.close()
+    p.unlink()
+    copy.getPixels().close()
+    
+    image = a6image.Image(pixels.Pixels(0),1)
+    parallel.run(_invert_band,image,processes=2)
+    cornell.assert_equals(0,len(image.getPixels()))
+    
+    image = a6image.Image(pixels.Pixels(4),1)
+    parallel.run(_invert_band,image,processes=3)
+    cornell.assert_equals([(255,255,255)]*4,list(image.getPixels()))
+    cornell.assert_equals(1.0,image.getPixels().progress())
+
+
 def test_image_init():
     """
     Tests the __init__ method and getters for class Image
@@ -244,6 +396,332 @@ def test_image_other():
         exit()
 
 
+def test_image_bulk():
+    """
+    Tests the bulk row, rectangle and channel methods in class Image
+    """
+    print('Testing image bulk access')
+    import a6image
+    p = pixels.Pixels(6)
+    for pos in range(6):
+        p[pos] = (pos,10*pos,20*pos)
+    
+    image = a6image.Image(p,3)
+    cornell.assert_equals(bytes([3,30,60,4,40,80,5,50,100]),image.getRow(1))
+    cornell.assert_equals(bytes([1,10,20,4,40,80]),image.getRect(0,1,2,1))
+    cornell.assert_equals(bytes([0,10,20,30,40,50]),image.getChannel(1))
+    
+    image.setRow(0,bytes(range(9)))
+    cornell.assert_equals((3,4,5),image.getPixel(0,1))
+    image.fillRect(0,1,2,2,(9,9,9))
+    cornell.assert_equals((0,1,2),image.getPixel(0,0))
+    cornell.assert_equals((9,9,9),image.getPixel(1,2))
+    image.setRect(1,0,1,2,bytes([1,1,1,2,2,2]))
+    cornell.assert_equals((2,2,2),image.getPixel(1,1))
+    image.setChannel(2,bytes(6))
+    cornell.assert_equals((9,9,0),image.getPixel(0,1))
+    cornell.assert_equals([(0,2)],image.popDirtyRows())
+    image.setPixel(1,0,(1,1,1))
+    cornell.assert_equals([(1,2)],image.popDirtyRows())
+    
+    # Test enforcement
+    good = test_assert(image.getRow, [2], 'You are not enforcing the precondition on row value')
+    good = good and test_assert(image.getRect, [1, 1, 2, 1], 'You are not enforcing the precondition on rectangle height')
+    good = good and test_assert(image.fillRect, [0, 2, 1, 2, (0,0,0)], 'You are not enforcing the precondition on rectangle width')
+    good = good and test_assert(image.setRow, [0, bytes(3)], 'You are not enforcing the precondition on row data')
+    if not good:
+        exit()
+    
+    cornell.assert_equals([(0,0,2,3)],list(image.tiles()))
+    cornell.assert_equals([(0,0,2,2),(0,2,2,1)],list(image.tiles(2)))
+    image.setWidth(2)
+    cornell.assert_equals([(0,0,2,2),(2,0,1,2)],list(image.tiles(2)))
+
+
+def test_image_view():
+    """
+    Tests views of rectangles in class Image
+    """
+    print('Testing image views')
+    import a6image
+    p = pixels.Pixels(12)
+    for pos in range(12):
+        p[pos] = (pos,pos,pos)
+    
+    image = a6image.Image(p,4)
+    view  = image.view(1,1,2,2)
+    cornell.assert_true(view.isView())
+    cornell.assert_false(image.isView())
+    cornell.assert_equals(2,view.getWidth())
+    cornell.assert_equals(4,view.getLength())
+    cornell.assert_equals((5,5,5),view.getPixel(0,0))
+    cornell.assert_equals((10,10,10),view.getFlatPixel(3))
+    cornell.assert_equals(bytes([9,9,9,10,10,10]),view.getRow(1))
+    cornell.assert_equals(bytes([6,6,6,10,10,10]),view.getColumn(1))
+    cornell.assert_equals('[[(5, 5, 5), (6, 6, 6)],  [(9, 9, 9), (10, 10, 10)]]',str(view))
+    
+    # Writes go to the parent image
+    view.setPixel(1,0,(0,1,2))
+    cornell.assert_equals((0,1,2),image.getPixel(2,1))
+    view.fillRect(0,0,1,2,(7,7,7))
+    cornell.assert_equals((7,7,7),image.getPixel(1,2))
+    cornell.assert_equals((4,4,4),image.getPixel(1,0))
+    cornell.assert_equals((7,7,7),image.getPixel(1,1))
+    view.setChannel(0,bytes([1,2,3,4]))
+    cornell.assert_equals((4,10,10),image.getPixel(2,2))
+    cornell.assert_equals((3,3,3),image.getPixel(0,3))
+    
+    # Views of views, and copies
+    inner = view.view(1,1,1,1)
+    cornell.assert_equals((4,10,10),inner.getPixel(0,0))
+    other = view.copy()
+    cornell.assert_false(other.isView())
+    other.setPixel(0,0,(0,0,0))
+    cornell.assert_equals((1,7,7),view.getPixel(0,0))
+    cornell.assert_equals(4,len(view.getPixels()))
+    cornell.assert_equals(None,view.popDirtyRows())
+    
+    # Test enforcement
+    good = test_assert(view.getFlatPixel, [4], 'You are not enforcing the precondition on view position')
+    good = good and test_assert(view.setWidth, [1], 'You are not preventing a view from changing width')
+    good = good and test_assert(image.view, [2, 0, 2, 1], 'You are not enforcing the precondition on view height')
+    if not good:
+        exit()
+
+
+def test_image_orient():
+    """
+    Tests the (lazy) orientation methods in class Image
+    """
+    print('Testing image orientation')
+    import a6image
+    p = pixels.Pixels(6)
+    for pos in range(6):
+        p[pos] = (pos,pos,pos)
+    
+    image = a6image.Image(p,3)
+    image.transpose()
+    cornell.assert_equals(2,image.getWidth())
+    cornell.assert_equals(3,image.getHeight())
+    cornell.assert_equals(bytes([1,1,1,4,4,4]),image.getRow(1))
+    cornell.assert_true(image.getPixelList() is p)
+    cornell.assert_equals((1,1,1),p[1])  # Nothing has moved yet
+    cornell.assert_equals((3,3,3),image.getPixel(0,1))
+    
+    image.rotateRight()
+    cornell.assert_equals('[[(2, 2, 2), (1, 1, 1), (0, 0, 0)],  [(5, 5, 5), (4, 4, 4), (3, 3, 3)]]',str(image))
+    image.reflectVert()
+    image.reflectHori()
+    cornell.assert_equals((3,3,3),image.getPixel(0,0))
+    cornell.assert_equals([(0,2)],image.popDirtyRows())
+    
+    copy = image.copy()
+    cornell.assert_equals((3,3,3),copy.getPixel(0,0))
+    image.materialize()
+    cornell.assert_equals((5,5,5),image.getPixels()[2])
+    cornell.assert_equals((2,2,2),p[5])
+    
+    for _ in range(4):
+        copy.rotateLeft()
+    cornell.assert_equals(str(image),str(copy))
+    
+    # A view moves its pixels
+    square = a6image.Image(pixels.Pixels(9),3)
+    square.setPixel(1,2,(1,2,3))
+    square.view(1,1,2,2).rotateLeft()
+    cornell.assert_equals((1,2,3),square.getPixel(1,1))
+    
+    # Test enforcement
+    view = image.view(0,0,1,2)
+    good = test_assert(view.transpose, [], 'You are not preventing a view from changing shape')
+    if not good:
+        exit()
+
+
+def test_image_mean():
+    """
+    Tests the regionMean method (and summed-area table cache) in class Image
+    """
+    print('Testing image region means')
+    import a6image
+    p = pixels.Pixels(6)
+    for pos in range(6):
+        p[pos] = (pos,10*pos,255)
+    
+    image = a6image.Image(p,3)
+    cornell.assert_equals((2,25,255),image.regionMean((0,0,2,3)))
+    cornell.assert_equals((4,40,255),image.regionMean((1,1,1,1)))
+    cornell.assert_equals((2,20,255),image.regionMean((0,0,2,2)))
+    
+    # The tables are shared with copies until the pixels change
+    tables = image._integral()
+    copy = image.copy()
+    cornell.assert_equals(id(tables),id(copy._integral()))
+    copy.setPixel(0,0,(255,255,255))
+    cornell.assert_not_equals(id(tables),id(copy._integral()))
+    cornell.assert_equals((86,95,255),copy.regionMean((0,0,1,3)))
+    cornell.assert_equals(id(tables),id(image._integral()))
+    cornell.assert_equals((0,0,255),image.getPixel(0,0))
+    
+    # The cache counts towards the footprint, but not as a copy of the buffer
+    del copy
+    cornell.assert_equals(18+6+3*8*12,p.footprint()[0])
+    buffer = p.buffer
+    image.setPixel(0,0,(3,3,3))
+    cornell.assert_true(buffer is p.buffer)
+    cornell.assert_equals(18+6,p.footprint()[0])
+    cornell.assert_equals((3,21,192),image.regionMean((0,0,2,2)))
+    
+    # The tables follow the orientation
+    image.transpose()
+    cornell.assert_equals((3,30,255),image.regionMean((0,1,1,1)))
+    
+    # Undoing a pixellate keeps the tables of the edit before it (even as a delta)
+    import a6editor
+    data = pixels.Pixels(100)
+    for pos in range(100):
+        data[pos] = (pos,2*pos,255-pos)
+    editor = a6editor.Editor(a6image.Image(data,10))
+    editor.BACKGROUND = False
+    for step in range(3):
+        editor.increment()
+        editor.getCurrent().setPixel(step,step,(step,step,step))
+    key = ('integral',0,10,1,10,10)
+    tables = []
+    for step in (2,5,3):
+        editor.increment()
+        editor.pixellate(step)
+        cornell.assert_true(editor.undo())
+        tables.append(editor.getCurrent().getPixels().getcached(key))
+    cornell.assert_true(tables[0] is not None)
+    cornell.assert_true(tables[0] is tables[1] and tables[1] is tables[2])
+    cornell.assert_true(editor._history[-2].getPixels().isdelta())
+    
+    # Test enforcement
+    good = test_assert(image.regionMean, [(0,0,0,1)], 'You are not enforcing the precondition on rectangle height')
+    good = good and test_assert(image.regionMean, [(2,0,2,1)], 'You are not enforcing the precondition on rectangle row')
+    if not good:
+        exit()
+
+
+def test_lut():
+    """
+    Tests the lookup table functions in module lut
+    """
+    print('Testing lookup tables')
+    import a6image
+    import lut
+    cornell.assert_equals(255,lut.invert()[0])
+    cornell.assert_equals(lut.identity(),lut.compose(lut.invert(),lut.invert()))
+    cornell.assert_equals(lut.identity(),lut.gamma(1))
+    cornell.assert_equals(255,lut.gamma(2.2)[255])
+    cornell.assert_true(lut.gamma(2.2)[64] > 64)
+    cornell.assert_equals(0,lut.levels(16,235)[10])
+    cornell.assert_equals(255,lut.levels(16,235)[240])
+    cornell.assert_equals(128,lut.contrast(3)[128])
+    cornell.assert_equals(0,lut.contrast(3)[50])
+    
+    p = pixels.Pixels(4)
+    p[0] = (10,20,30)
+    p[3] = (200,100,50)
+    image = a6image.Image(p,2)
+    lut.apply(image,lut.invert())
+    cornell.assert_equals((245,235,225),image.getPixel(0,0))
+    lut.apply(image,lut.identity(),lut.invert(),lut.identity())
+    cornell.assert_equals((55,100,205),image.getPixel(1,1))
+    
+    lut.mix(image,(0.3,0.6,0.1))
+    cornell.assert_equals((97,97,97),image.getPixel(1,1))
+    lut.mix(image.view(0,0,1,1),(0.3,0.6,0.1),(1,0.6,0.4))
+    cornell.assert_equals((108,65,43),image.getPixel(0,0))
+    cornell.assert_equals((97,97,97),image.getPixel(1,1))
+    
+    # The filters work one band of rows at a time
+    limit = a6image.Image.BAND_BYTES
+    a6image.Image.BAND_BYTES = 1
+    cornell.assert_equals([(0,0,1,2),(1,0,1,2)],list(image.bands()))
+    lut.apply(image,lut.invert(),lut.identity(),lut.invert())
+    cornell.assert_equals((147,65,212),image.getPixel(0,0))
+    cornell.assert_equals((158,97,158),image.getPixel(1,1))
+    lut.mix(image,(0,1,0))
+    cornell.assert_equals((65,65,65),image.getPixel(0,0))
+    cornell.assert_equals((97,97,97),image.getPixel(1,1))
+    a6image.Image.BAND_BYTES = limit
+    
+    # Test enforcement
+    good = test_assert(lut.apply, [image, bytes(10)], 'You are not enforcing the precondition on tables')
+    good = good and test_assert(lut.gamma, [0], 'You are not enforcing the precondition on gamma')
+    if not good:
+        exit()
+
+
+def test_masks():
+    """
+    Tests the cached weight masks in module masks
+    """
+    print('Testing weight masks')
+    import a6image
+    import masks
+    import random
+    mask = masks.vignette(4,2)
+    cornell.assert_equals(8,len(mask))
+    cornell.assert_equals(0.0,mask[0])
+    cornell.assert_equals(1.0,mask[6])
+    cornell.assert_equals(id(mask),id(masks.vignette(4,2)))
+    
+    p = pixels.Pixels(8)
+    for pos in range(8):
+        p[pos] = (200,100,51)
+    image = a6image.Image(p,4)
+    masks.apply(image,mask)
+    cornell.assert_equals((0,0,0),image.getPixel(0,0))
+    cornell.assert_equals((200,100,51),image.getPixel(1,2))
+    cornell.assert_equals((160,80,41),image.getPixel(1,1))
+    
+    # The weights are doubles, so the results are exact with or without NumPy
+    rand = random.Random(5)
+    data = bytes(rand.randrange(256) for _ in range(3*80*60))
+    hfD  = 40**2+30**2
+    expected = bytes(round((1-((pos//240-30)**2+(pos//3 % 80-40)**2)/hfD)*data[pos]) 
+                     for pos in range(len(data)))
+    for numpy in (masks.numpy,None):
+        module = masks.numpy
+        masks.numpy = numpy
+        masks.clearcache()
+        p = pixels.Pixels(80*60)
+        p.setspan(0,data)
+        image = a6image.Image(p,80)
+        image.BAND_BYTES = 3*80*7
+        masks.apply(image,masks.vignette(80,60))
+        masks.numpy = module
+        cornell.assert_equals(expected,image.getRect(0,0,60,80))
+    
+    # Masks are read-only, and the cache is limited by bytes
+    failed = False
+    try:
+        mask[0] = 1.0
+    except (TypeError,ValueError):
+        failed = True
+    cornell.assert_true(failed)
+    limit = masks.CACHE_BYTES
+    masks.clearcache()
+    masks.CACHE_BYTES = 80
+    masks.vignette(2,2)
+    masks.vignette(3,2)
+    cornell.assert_equals((2,80),masks.cacheinfo())
+    masks.vignette(5,2)
+    cornell.assert_equals((1,80),masks.cacheinfo())
+    masks.vignette(20,20)
+    cornell.assert_equals((1,80),masks.cacheinfo())
+    masks.CACHE_BYTES = limit
+    
+    # Test enforcement
+    good = test_assert(masks.apply, [image, masks.vignette(2,2)], 'You are not enforcing the precondition on mask size')
+    good = good and test_assert(masks.vignette, [0, 2], 'You are not enforcing the precondition on width')
+    if not good:
+        exit()
+
+
 def test_hist_init():
     """
     Tests the __init__ method and getters in ImageHistory
@@ -344,19 +822,736 @@ def test_hist_edit():
     cornell.assert_not_equals(id(bottom), id(hist._history[0]))
 
 
+def test_hist_delta():
+    """
+    Tests the delta storage of old edits in ImageHistory
+    """
+    print('Testing history deltas')
+    import a6image
+    import a6history
+    p = pixels.Pixels(64)
+    for pos in range(64):
+        p[pos] = (pos,2*pos,3*pos)
+    
+    q = p.copy()
+    q[5] = (1,1,1)
+    q.setspan(10,bytes(9))
+    cornell.assert_equals([(5,6),(10,13)],q.changes())
+    r = q.copy()
+    cornell.assert_equals([],r.changes())
+    r[63] = (1,1,1)
+    r[0]  = (1,1,1)
+    cornell.assert_equals([(0,1),(63,64)],r.changes())
+    cornell.assert_true(q.makedelta(p,q.changes()))
+    cornell.assert_true(q.isdelta())
+    cornell.assert_equals(None,q.changes())
+    p[5] = (7,7,7)
+    cornell.assert_equals((1,1,1),q[5])
+    cornell.assert_equals((0,0,0),q[11])
+    cornell.assert_equals(p[20],q[20])
+    cornell.assert_false(q.isdelta())
+    
+    r = q.copy()
+    r.view()[0,0] = 9
+    cornell.assert_equals(None,r.changes())
+    r.DIFF_CHUNK = 8
+    cornell.assert_true(r.makedelta(q))
+    cornell.assert_equals((9,0,0),r[0])
+    cornell.assert_false(q.copy().makedelta(pixels.Pixels(64)))
+    
+    image = a6image.Image(p,8)
+    hist  = a6history.ImageHistory(image)
+    steps = []
+    for step in range(12):
+        hist.getCurrent().setPixel(step%8,step//8,(255,step,0))
+        steps.append(hist.getCurrent().getRect(0,0,8,8))
+        hist.increment()
+    
+    chain = 0
+    for entry in hist._history[:-2]:
+        chain = chain+1 if entry.getPixels().isdelta() else 0
+        cornell.assert_true(chain < hist.KEYFRAME)
+    cornell.assert_true(hist._history[-2].getPixels().isdelta())
+    cornell.assert_false(hist.getCurrent().getPixels().isdelta())
+    
+    cornell.assert_true(hist.undo())
+    while len(hist._history) > 1:
+        current = hist.getCurrent()
+        cornell.assert_true(current.getPixels().tracking)
+        cornell.assert_equals(steps[len(hist._history)-1],current.getRect(0,0,8,8))
+        cornell.assert_false(current.getPixels().isdelta())
+        hist.undo()
+    cornell.assert_equals(steps[0],hist.getCurrent().getRect(0,0,8,8))
+
+
+def test_hist_spill():
+    """
+    Tests the memory budget of ImageHistory, which spills old edits to disk
+    """
+    print('Testing history spilling')
+    import a6image
+    import a6history
+    p = pixels.Pixels(100)
+    p.setspan(0,bytes(range(250))+bytes(50))
+    q = p.copy()
+    cornell.assert_equals((400,0),p.footprint())
+    cornell.assert_equals((100,0),q.footprint({id(p.buffer)}))
+    cornell.assert_equals(0,q.exclusive())
+    p.tracking = False
+    cornell.assert_equals((300,0),p.footprint())
+    
+    size = q.spill()
+    cornell.assert_true(q.isspilled())
+    cornell.assert_equals((0,size),q.footprint())
+    cornell.assert_equals(size,q.spill())
+    cornell.assert_equals(p[70],q[70])
+    cornell.assert_false(q.isspilled())
+    
+    image = a6image.Image(p,10)
+    hist  = a6history.ImageHistory(image)
+    hist.MAX_BYTES = 450
+    steps = []
+    for step in range(8):
+        hist.getCurrent().fillRect(0,0,10,10,(step,step,step))
+        steps.append(hist.getCurrent().getRect(0,0,10,10))
+        hist.increment()
+        worker = hist._worker
+        if worker is not None:
+            worker.join()
+    
+    stats = hist.getStats()
+    cornell.assert_equals(9,stats['edits'])
+    cornell.assert_true(stats['resident'] <= 450)
+    cornell.assert_true(stats['files'] > 0)
+    cornell.assert_true(stats['spilled'] > 0)
+    cornell.assert_true(hist._history[0].getPixels().isspilled())
+    cornell.assert_false(hist.getCurrent().getPixels().isspilled())
+    
+    while hist.undo():
+        step = len(hist._history)-1
+        cornell.assert_equals(steps[step],hist.getCurrent().getRect(0,0,10,10))
+    cornell.assert_equals(0,hist.getStats()['spilled'])
+
+
+def test_hist_pack():
+    """
+    Tests the background compression of idle edits in ImageHistory
+    """
+    print('Testing history packing')
+    import a6image
+    import a6history
+    import random
+    import threading
+    p = pixels.Pixels(400)
+    p.fillspan(0,200,(10,20,30))
+    q = p.copy()
+    
+    # Packing a shared buffer would only add to the memory in use
+    cornell.assert_false(q.pack())
+    q.unpack()
+    cornell.assert_true(q.pack())
+    cornell.assert_true(q.ispacked())
+    cornell.assert_false(q.pack())
+    cornell.assert_true(q.footprint()[0] < 100)
+    q.unpack()
+    cornell.assert_false(q.ispacked())
+    cornell.assert_equals(p.buffer,q.buffer)
+    cornell.assert_not_equals(id(p.buffer),id(q.buffer))
+    cornell.assert_true(q.pack())
+    cornell.assert_true(q.spill() > 0)
+    cornell.assert_equals((10,20,30),q[199])
+    
+    # A list that tracks changes is in use, so it is not packed under a lock
+    lock = threading.RLock()
+    r = p.copy()
+    r.unpack()
+    cornell.assert_false(r.pack(lock))
+    r.tracking = False
+    cornell.assert_true(r.pack(lock))
+    cornell.assert_equals(p.buffer,r.buffer)
+    
+    # Neither is a buffer that does not compress
+    noise = pixels.Pixels(100)
+    noise.setspan(0,random.Random(1).randbytes(300))
+    cornell.assert_false(noise.pack())
+    cornell.assert_equals(300,noise.footprint()[0]-100)
+    
+    image = a6image.Image(p,20)
+    hist  = a6history.ImageHistory(image)
+    steps = []
+    for step in range(6):
+        current = hist.getCurrent()
+        current.setRect(0,0,20,20,current.getRect(0,0,20,20).translate(bytes(range(255,-1,-1))))
+        steps.append(current.getRect(0,0,20,20))
+        hist.increment()
+        worker = hist._worker
+        if worker is not None:
+            worker.join()
+    
+    # The last idle edit shares its buffer with the current one, so it is not packed
+    stats = hist.getStats()
+    cornell.assert_equals(5,stats['packed'])
+    cornell.assert_true(stats['resident'] < 6*1200)
+    cornell.assert_false(hist.getCurrent().getPixels().ispacked())
+    cornell.assert_false(hist._history[-2].getPixels().ispacked())
+    
+    while hist.undo():
+        step = len(hist._history)-1
+        cornell.assert_false(hist.getCurrent().getPixels().ispacked())
+        cornell.assert_equals(steps[step],hist.getCurrent().getRect(0,0,20,20))
+    
+    # Packing never adds to the memory in use
+    hist = a6history.ImageHistory(a6image.Image(noise.copy(),10))
+    hist.BACKGROUND = False
+    for step in range(4):
+        hist.increment()
+        if step < 2:
+            current = hist.getCurrent()
+            current.setRect(0,0,10,10,current.getRect(0,0,10,10).translate(bytes(range(255,-1,-1))))
+        else:
+            hist.getCurrent().setPixel(0,0,(step,step,step))
+    before = hist.getStats()['resident']
+    hist._work()
+    cornell.assert_true(hist.getStats()['resident'] <= before)
+    cornell.assert_false(hist._history[0].getPixels().ispacked())
+    cornell.assert_true(hist._history[0].getPixels().buffer is noise.buffer)
+
+
+def test_hist_tiles():
+    """
+    Tests the content-addressed tile store for the keyframes of ImageHistory
+    """
+    print('Testing history tiles')
+    import a6image
+    import a6history
+    store = pixels.TileStore(4)
+    cornell.assert_equals(4,store.getTile())
+    cornell.assert_equals(pixels.TileStore.TILE,pixels.TileStore().getTile())
+    p = pixels.Pixels(60)
+    p.fillspan(0,60,(9,9,9))
+    p[59] = (1,2,3)
+    q = p.copy()
+    cornell.assert_true(q.dedupe(store,10))
+    cornell.assert_true(q.isdeduped())
+    cornell.assert_equals(3,len(store))
+    cornell.assert_equals((16+8+4)*3,q.footprint()[0])
+    r = p.copy()
+    r.dedupe(store,10)
+    cornell.assert_equals(3,len(store))
+    cornell.assert_equals(p.buffer,q.buffer)
+    cornell.assert_false(q.isdeduped())
+    del q, r
+    cornell.assert_equals(0,len(store))
+    
+    p = pixels.Pixels(64*64*4)
+    for pos in range(0,len(p),61):
+        p[pos] = (pos%256,0,255)
+    image = a6image.Image(p,128)
+    hist  = a6history.ImageHistory(image)
+    hist.BACKGROUND = False
+    steps = []
+    for step in range(11):
+        hist.getCurrent().setPixel(step,step,(step,step,step))
+        steps.append(hist.getCurrent().getRect(0,0,128,128))
+        hist.increment()
+    
+    cornell.assert_true(hist._history[5].getPixels().isdeduped())
+    cornell.assert_true(hist._history[10].getPixels().isdeduped())
+    cornell.assert_equals(5,hist.getStats()['tiles'])
+    while hist.undo():
+        step = len(hist._history)-1
+        cornell.assert_equals(steps[step],hist.getCurrent().getRect(0,0,128,128))
+    cornell.assert_equals(0,hist.getStats()['tiles'])
+
+
+def test_recipe():
+    """
+    Tests the operation log editor and recipes in the module recipe
+    """
+    print('Testing operation logs')
+    import os
+    import tempfile
+    import a6image
+    import lut
+    import recipe
+    p = pixels.Pixels(120)
+    for pos in range(120):
+        p[pos] = (pos,2*pos,255-pos)
+    image  = a6image.Image(p,12)
+    editor = recipe.LogEditor(image)
+    editor.KEYFRAME = 3
+    
+    actions = [('invert',),('pixellate',3),('rotateLeft',),('encode','hi'),
+               ('curve',lut.gamma(2)),('monochromify',True),('jail',),('reflectHori',)]
+    steps = []
+    for action in actions:
+        editor.increment()
+        getattr(editor,action[0])(*action[1:])
+        current = editor.getCurrent()
+        steps.append(current.getRect(0,0,current.getHeight(),current.getWidth()))
+    
+    cornell.assert_equals(actions,editor.getLog())
+    cornell.assert_equals(9,editor.getStats()['edits'])
+    cornell.assert_equals(image,editor.getOriginal())
+    
+    # A failed encode does not change the image, so it is not recorded
+    cornell.assert_false(editor.encode('x'*200))
+    cornell.assert_equals(actions,editor.getLog())
+    cornell.assert_equals(0,editor.getStats()['tiles'])
+    
+    # Keyword arguments are recorded as positional ones
+    other = recipe.LogEditor(image)
+    other.curve(lut.invert(),blue=lut.identity())
+    cornell.assert_equals([('curve',lut.invert(),None,lut.identity())],other.getLog())
+    cornell.assert_equals((255-p[5][0],255-p[5][1],p[5][2]),other.getCurrent().getPixel(0,5))
+    cornell.assert_equals(2,editor.getStats()['snapshots'])
+    
+    result = recipe.apply(image,editor.getLog())
+    cornell.assert_equals(steps[-1],result.getRect(0,0,12,10))
+    cornell.assert_equals(p[0],image.getPixel(0,0))
+    
+    name = os.path.join(tempfile.mkdtemp(),'recipe.txt')
+    recipe.save(editor.getLog(),name)
+    cornell.assert_equals(actions,recipe.load(name))
+    os.remove(name)
+    
+    while len(editor.getLog()) > 0:
+        cornell.assert_true(editor.undo())
+        current = editor.getCurrent()
+        data = current.getRect(0,0,current.getHeight(),current.getWidth())
+        expected = steps[len(editor.getLog())-1] if editor.getLog() else bytes(p.buffer)
+        cornell.assert_equals(expected,data)
+    cornell.assert_false(editor.undo())
+    cornell.assert_equals(0,editor.getStats()['snapshots'])
+
+
+def test_imagefile_read():
+    """
+    Tests reading image files headless with the module imagefile
+    """
+    print('Testing image file reading')
+    import os
+    import tempfile
+    import imagefile
+    if imagefile.CoreImage is None:
+        print('PIL is not installed; skipping image file tests')
+        return
+    
+    data = bytes(range(60))
+    name = os.path.join(tempfile.mkdtemp(),'image.png')
+    imagefile.CoreImage.frombytes('RGB',(5,4),data).save(name)
+    image = imagefile.read(name)
+    cornell.assert_equals(5,image.getWidth())
+    cornell.assert_equals(4,image.getHeight())
+    cornell.assert_equals(data,image.getRect(0,0,4,5))
+    
+    # The decoded bytes are copied only when the image is modified
+    image.setPixel(0,0,(9,9,9))
+    cornell.assert_equals((9,9,9),image.getPixel(0,0))
+    cornell.assert_equals((3,4,5),image.getPixel(0,1))
+    
+    # Other modes are converted to RGB
+    imagefile.CoreImage.frombytes('L',(2,1),bytes([7,200])).save(name)
+    image = imagefile.read(name)
+    cornell.assert_equals([(7,7,7),(200,200,200)],list(image.getPixels()))
+    
+    os.remove(name)
+    failed = False
+    try:
+        imagefile.read(name)
+    except OSError:
+        failed = True
+    cornell.assert_true(failed)
+
+
+def test_imagefile_write():
+    """
+    Tests writing image files headless with the module imagefile
+    """
+    print('Testing image file writing')
+    import os
+    import tempfile
+    import a6image
+    import imagefile
+    if imagefile.CoreImage is None:
+        print('PIL is not installed; skipping image file tests')
+        return
+    
+    p = pixels.Pixels(20)
+    for pos in range(20):
+        p[pos] = (pos,10*pos,255-pos)
+    image = a6image.Image(p,5)
+    name = os.path.join(tempfile.mkdtemp(),'image.png')
+    for level in [0,1,9]:
+        imagefile.write(image,name,level)
+        result = imagefile.read(name)
+        cornell.assert_equals(bytes(p.buffer),result.getRect(0,0,4,5))
+    
+    # Rotated images are saved as they are displayed
+    image.rotateLeft()
+    imagefile.write(image,name)
+    result = imagefile.read(name)
+    cornell.assert_equals(4,result.getWidth())
+    cornell.assert_equals(image.getRect(0,0,5,4),result.getRect(0,0,5,4))
+    os.remove(name)
+    
+    test_assert(imagefile.write,[image,name,10],'write did not reject level 10')
+
+
+def test_imagefile_proxy():
+    """
+    Tests reading reduced proxy images with the module imagefile
+    """
+    print('Testing proxy images')
+    import os
+    import tempfile
+    import imagefile
+    if imagefile.CoreImage is None:
+        print('PIL is not installed; skipping image file tests')
+        return
+    
+    folder = tempfile.mkdtemp()
+    name = os.path.join(folder,'image.png')
+    imagefile.CoreImage.new('RGB',(40,30),(10,20,30)).save(name)
+    image = imagefile.read(name,(10,10))
+    cornell.assert_true(isinstance(image,imagefile.Proxy))
+    cornell.assert_equals((14,10),(image.getWidth(),image.getHeight()))
+    cornell.assert_equals((10,20,30),image.getPixel(5,5))
+    cornell.assert_equals((40,30),image.getFullSize())
+    cornell.assert_equals(name,image.copy().getSource())
+    
+    full = image.load()
+    cornell.assert_false(isinstance(full,imagefile.Proxy))
+    cornell.assert_equals((40,30),(full.getWidth(),full.getHeight()))
+    
+    # JPEG files are decoded at reduced size, at least as large as asked for
+    name = os.path.join(folder,'image.jpg')
+    imagefile.CoreImage.new('RGB',(400,300),(10,20,30)).save(name)
+    image = imagefile.read(name,(90,60))
+    cornell.assert_equals((100,75),(image.getWidth(),image.getHeight()))
+    cornell.assert_equals((400,300),image.getFullSize())
+    image = imagefile.read(name,(400,300))
+    cornell.assert_equals((400,300),(image.getWidth(),image.getHeight()))
+    
+    os.remove(name)
+    os.remove(os.path.join(folder,'image.png'))
+    test_assert(imagefile.read,[name,(0,10)],'read did not reject size (0,10)')
+
+
+def test_imagefile_cache():
+    """
+    Tests the cache of decoded images in the module imagefile
+    """
+    print('Testing image file cache')
+    import os
+    import tempfile
+    import imagefile
+    if imagefile.CoreImage is None:
+        print('PIL is not installed; skipping image file tests')
+        return
+    
+    imagefile.clearcache()
+    name = os.path.join(tempfile.mkdtemp(),'image.png')
+    imagefile.CoreImage.new('RGB',(4,3),(10,20,30)).save(name)
+    first  = imagefile.read(name)
+    second = imagefile.read(name)
+    cornell.assert_equals((1,36),imagefile.cacheinfo())
+    cornell.assert_true(first.getPixels()._owners is second.getPixels()._owners)
+    
+    # Edits never reach the cache
+    first.setPixel(0,0,(1,2,3))
+    cornell.assert_equals((10,20,30),imagefile.read(name).getPixel(0,0))
+    cornell.assert_true(imagefile.read(name).getPixels().tracking)
+    
+    # Proxies are cached separately
+    imagefile.read(name,(2,1))
+    cornell.assert_equals((2,48),imagefile.cacheinfo())
+    
+    # A changed file is decoded again
+    imagefile.CoreImage.new('RGB',(2,3),(40,50,60)).save(name)
+    os.utime(name,ns=(0,0))
+    image = imagefile.read(name)
+    cornell.assert_equals((40,50,60),image.getPixel(0,0))
+    cornell.assert_equals((2,30),imagefile.cacheinfo())
+    
+    # The least recently used images are dropped to fit the budget
+    budget = imagefile.CACHE_BYTES
+    imagefile.CACHE_BYTES = 10
+    imagefile.read(name,(1,1))
+    cornell.assert_equals((1,6),imagefile.cacheinfo())
+    imagefile.CACHE_BYTES = budget
+    
+    imagefile.clearcache()
+    cornell.assert_equals((0,0),imagefile.cacheinfo())
+    cornell.assert_equals((40,50,60),image.getPixel(0,0))
+    os.remove(name)
+
+
+def test_imagefile_pix():
+    """
+    Tests the native .pix format of the module imagefile
+    """
+    print('Testing .pix files')
+    import os
+    import tempfile
+    import a6image
+    import a6history
+    import imagefile
+    p = pixels.Pixels(20)
+    for pos in range(20):
+        p[pos] = (pos,10*pos,255-pos)
+    image = a6image.Image(p,5)
+    name = os.path.join(tempfile.mkdtemp(),'image.pix')
+    imagefile.write(image,name)
+    cornell.assert_equals(imagefile.PIX_HEADER.size+60,os.path.getsize(name))
+    
+    result = imagefile.read(name)
+    cornell.assert_true(isinstance(result.getPixels(),pixels.MappedPixels))
+    cornell.assert_equals((5,4),(result.getWidth(),result.getHeight()))
+    cornell.assert_equals(bytes(p.buffer),result.getRect(0,0,4,5))
+    
+    # Edits are not written to the file, and the file can be replaced while mapped
+    result.setPixel(0,0,(9,9,9))
+    image.rotateRight()
+    cornell.assert_false(image.isFlat())
+    imagefile.write(image,name)
+    cornell.assert_equals((9,9,9),result.getPixel(0,0))
+    cornell.assert_equals(bytes(p.buffer)[3:],result.getRect(0,0,4,5)[3:])
+    rotated = imagefile.read(name)
+    cornell.assert_equals((4,5),(rotated.getWidth(),rotated.getHeight()))
+    cornell.assert_equals(image.getRect(0,0,5,4),rotated.getRect(0,0,5,4))
+    
+    # Copies of a .pix image are plain pixel lists, so edits can be stored as deltas
+    cornell.assert_true(rotated.isFlat())
+    hist = a6history.ImageHistory(rotated)
+    hist.BACKGROUND = False
+    for step in range(3):
+        hist.increment()
+        hist.getCurrent().setPixel(0,0,(step,step,step))
+    cornell.assert_true(type(hist.getCurrent().getPixels()) == pixels.Pixels)
+    cornell.assert_true(hist._history[2].getPixels().isdelta())
+    cornell.assert_equals(image.getRect(0,0,5,4),rotated.getRect(0,0,5,4))
+    del hist
+    cornell.assert_equals(1,len(os.listdir(os.path.dirname(name))))
+    result.getPixels().close()
+    rotated.getPixels().close()
+    
+    with open(name,'r+b') as file:
+        file.write(b'PNG!')
+    failed = False
+    try:
+        imagefile.read(name)
+    except OSError:
+        failed = True
+    cornell.assert_true(failed)
+    os.remove(name)
+    
+    # A failed write leaves no temporary file behind, and raises the original error
+    os.mkdir(name)
+    failed = False
+    try:
+        imagefile.write(image,name)
+    except OSError:
+        failed = True
+    cornell.assert_true(failed)
+    cornell.assert_equals(1,len(os.listdir(os.path.dirname(name))))
+    os.rmdir(name)
+    failed = False
+    try:
+        imagefile.write(image,os.path.join(name,'image.pix'))
+    except FileNotFoundError as error:
+        failed = error.filename.endswith('.tmp') and error.__context__ is None
+    cornell.assert_true(failed)
+
+
+def test_pixels_slices():
+    """
+    Tests contiguous and extended slices of the pixel list
+    """
+    print('Testing pixel list slices')
+    p = pixels.Pixels(6)
+    for pos in range(6):
+        p[pos] = (pos,pos+10,pos+20)
+    
+    cornell.assert_equals([p[1],p[2]],list(p[1:3]))
+    cornell.assert_equals([p[0],p[2],p[4]],list(p[::2]))
+    cornell.assert_equals([p[5],p[3],p[1]],list(p[::-2]))
+    cornell.assert_equals([p[4],p[3],p[2],p[1],p[0]],list(p[4::-1]))
+    cornell.assert_equals([p[4],p[5]],list(p[-2:]))
+    cornell.assert_equals([],list(p[3:1]))
+    
+    q = pixels.Pixels(6)
+    q[1::2] = p[:3]
+    cornell.assert_equals([(0,0,0),p[0],(0,0,0),p[1],(0,0,0),p[2]],list(q))
+    cornell.assert_equals(0.5,q.progress())
+    q[::-1] = p
+    cornell.assert_equals(list(p[::-1]),list(q))
+    cornell.assert_equals(bytes([5,15,25,2,12,22]),p.getspan(5,2,-3))
+    q.setspan(0,bytes(6),3)
+    cornell.assert_equals((0,0,0),q[3])
+    cornell.assert_equals(p[1],q[4])
+    
+    good = test_assert(p.getspan,[4,2,2],'You are not enforcing the precondition on span end')
+    good = good and test_assert(p.getspan,[-1,1,1],'You are not enforcing the precondition on start')
+    good = good and test_assert(q.setspan,[6,bytes(3),-1],'You are not enforcing the precondition on start')
+    good = good and test_assert(q.setspan,[1,bytes(6),-2],'You are not enforcing the precondition on span end')
+    if not good:
+        exit()
+
+
+def test_pixels_copy():
+    """
+    Tests the copy-on-write copy method of the pixel list
+    """
+    print('Testing pixel list copy')
+    p = pixels.Pixels(4)
+    p[0] = (1,2,3)
+    q = p.copy()
+    cornell.assert_not_equals(id(p),id(q))
+    cornell.assert_equals(id(p.buffer),id(q.buffer))
+    cornell.assert_equals(list(p),list(q))
+    
+    q[1] = (4,5,6)
+    cornell.assert_not_equals(id(p.buffer),id(q.buffer))
+    cornell.assert_equals((0,0,0),p[1])
+    cornell.assert_equals((4,5,6),q[1])
+    
+    r = p.copy()
+    p.fillspan(0,4,(9,9,9))
+    cornell.assert_equals((1,2,3),r[0])
+    cornell.assert_equals((9,9,9),p[0])
+    
+    # A copy that goes away gives the buffer back
+    s = r.copy()
+    buffer = r.buffer
+    del s
+    r[0] = (0,0,0)
+    cornell.assert_equals(id(buffer),id(r.buffer))
+
+
+def test_pixels_buffer():
+    """
+    Tests the buffer protocol methods of the pixel list
+    """
+    print('Testing pixel list buffers')
+    data = bytearray(range(12))
+    p = pixels.Pixels.frombuffer(data)
+    cornell.assert_equals(4,len(p))
+    cornell.assert_equals((3,4,5),p[1])
+    p[0] = (9,9,9)
+    cornell.assert_equals(9,data[0])
+    data[11] = 0
+    cornell.assert_equals((9,10,0),p[3])
+    
+    # The caller can still write to data, so a copy does not share it
+    c = p.copy()
+    data[0] = 7
+    cornell.assert_equals((9,9,9),c[0])
+    cornell.assert_equals((7,9,9),p[0])
+    p.setcached('key',1)
+    cornell.assert_equals(None,p.getcached('key'))
+    
+    view = p.view()
+    cornell.assert_equals((4,3),view.shape)
+    view[2,1] = 100
+    cornell.assert_equals((6,100,8),p[2])
+    cornell.assert_equals(0,len(pixels.Pixels(0).view()))
+    
+    # A copy made after a view does not share the buffer that the view writes to
+    q = p.copy()
+    view[2,1] = 50
+    cornell.assert_equals((6,100,8),q[2])
+    cornell.assert_equals((6,50,8),p[2])
+    
+    # Read-only data is copied on the first write
+    data = bytes(6)
+    q = pixels.Pixels.frombuffer(data)
+    cornell.assert_equals((0,0,0),q[1])
+    q[1] = (1,2,3)
+    cornell.assert_equals((1,2,3),q[1])
+    cornell.assert_equals(bytes(6),data)
+    
+    # Pixel lists with storage of their own cannot use an outside buffer
+    for kind in (pixels.MappedPixels,pixels.SharedPixels):
+        failed = False
+        try:
+            kind.frombuffer(bytes(6))
+        except TypeError:
+            failed = True
+        cornell.assert_true(failed)
+
+
+def test_pixels_numpy():
+    """
+    Tests the NumPy-backed pixel list (skipped if NumPy is not installed)
+    """
+    if pixels.numpy is None:
+        return
+    print('Testing NumPy pixel list')
+    p = pixels.NumpyPixels(6)
+    p[0] = (255,0,0)
+    p[5] = (1,2,3)
+    cornell.assert_equals((255,0,0),p[0])
+    cornell.assert_equals((1,2,3),p[5])
+    cornell.assert_equals(int,type(p[0][0]))
+    
+    view = p.ndarray(3)
+    cornell.assert_equals((2,3,3),view.shape)
+    cornell.assert_equals([1,2,3],list(view[1,2]))
+    view[1,0] = (7,8,9)
+    cornell.assert_equals((7,8,9),p[3])
+    cornell.assert_equals(bytes(view),bytes(p.buffer))
+    c = p.copy()
+    view[1,0] = (0,0,0)
+    cornell.assert_equals((7,8,9),c[3])
+    
+    q = p[:]
+    cornell.assert_equals(pixels.NumpyPixels,type(q))
+    q[0] = (0,0,0)
+    cornell.assert_equals((255,0,0),p[0])
+    cornell.assert_equals(list(p[3:6]),list(q[3:6]))
+    
+    r = pixels.NumpyPixels.frombuffer(bytearray(6))
+    r[1] = (1,2,3)
+    cornell.assert_equals([1,2,3],list(r.ndarray(2)[0,1]))
+
+
 def test_all():
     """
     Execute all of the test cases.
     
     This function is called by __main__.py
     """
+    test_pixels_tracking()
+    test_pixels_slices()
+    test_pixels_copy()
+    test_pixels_buffer()
+    test_pixels_numpy()
+    test_pixels_mapped()
+    test_pixels_shared()
     test_image_init()
     test_image_setters()
     test_image_access()
     test_image_str()
     test_image_other()
+    test_image_bulk()
+    test_image_view()
+    test_image_orient()
+    test_image_mean()
+    test_lut()
+    test_masks()
+    test_imagefile_read()
+    test_imagefile_write()
+    test_imagefile_proxy()
+    test_imagefile_cache()
+    test_imagefile_pix()
     print('Class Image appears to be working correctly')
     print()
     test_hist_init()
     test_hist_edit()
+    test_hist_delta()
+    test_hist_spill()
+    test_hist_pack()
+    test_hist_tiles()
+    test_recipe()
     print('Class ImageHistory appears to be working correctly')
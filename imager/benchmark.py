@@ -0,0 +1,91 @@
+"""
+Timing benchmarks for the imager application
+
+This module times the geometric Editor operations two ways: the operation alone, which
+only changes the orientation of the image, and the operation followed by materializing
+the result, which is what the GUI pays before it draws the image.  The second is one
+strided copy per row, so it shows the cost of walking the pixel list against the grain.
+It is run from the command line with the --bench option.
+
+The image contents are random, since the operations do not depend on them.
+"""
+import os
+import time
+
+import a6editor
+import a6image
+import pixels
+
+
+# The operations to time
+OPERATIONS = ['rotateLeft','rotateRight','transpose','reflectVert','reflectHori']
+
+
+def make_image(width, height):
+    """
+    Returns: A new image with random contents
+
+    Parameter width: The image width
+    Precondition: width is an int > 0
+
+    Parameter height: The image height
+    Precondition: height is an int > 0
+    """
+    data = pixels.Pixels(width*height)
+    data.setspan(0,os.urandom(width*height*3))
+    return a6image.Image(data,width)
+
+
+def time_operation(image, name, repeat=3, draw=True):
+    """
+    Returns: The best time (in seconds) to apply the named operation to image
+
+    Each run starts from a fresh edit (via increment), just like the GUI does.  The
+    geometric operations only change the orientation of the image, so if draw is True,
+    the time includes materializing the result (as the GUI does before drawing it).
+
+    Parameter image: The image to edit
+    Precondition: image is an Image object
+
+    Parameter name: The name of an Editor method taking no arguments
+    Precondition: name is a string
+
+    Parameter repeat: The number of runs
+    Precondition: repeat is an int > 0
+
+    Parameter draw: Whether to materialize the result
+    Precondition: draw is a bool
+    """
+    editor = a6editor.Editor(image)
+    best = None
+    for _ in range(repeat):
+        editor.increment()
+        start = time.perf_counter()
+        getattr(editor,name)()
+        if draw:
+            editor.getCurrent().materialize()
+        elapsed = time.perf_counter()-start
+        best = elapsed if best is None else min(best,elapsed)
+    return best
+
+
+def run(width=1024, height=768, repeat=3):
+    """
+    Times each operation with and without materializing and prints a table of the results.
+
+    Parameter width: The image width
+    Precondition: width is an int > 0
+
+    Parameter height: The image height
+    Precondition: height is an int > 0
+
+    Parameter repeat: The number of runs per operation (the best is reported)
+    Precondition: repeat is an int > 0
+    """
+    image = make_image(width,height)
+    print('Image size {}x{}, best of {}'.format(width,height,repeat))
+    print('{:<14}{:>12}{:>12}'.format('operation','lazy','drawn'))
+    for name in OPERATIONS:
+        first  = time_operation(image,name,repeat,False)
+        second = time_operation(image,name,repeat)
+        print('{:<14}{:>10.3f}ms{:>10.3f}ms'.format(name,first*1000,second*1000))
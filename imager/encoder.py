@@ -112,6 +112,7 @@ class EncoderPanel(AppPanel):
         """
         try:
             self.workspace.increment()
+            self.workimage.follow(self.workspace.getCurrent())
             if not self.workspace.encode(self.textpanel.hidden.text):
                 self.error('The message could not be encoded')
                 self.workspace.undo()
@@ -134,8 +134,9 @@ class FilterPanel(AppPanel):
         The action parameters are an expanded list where the first element is a callable
         and any other elements are parameters to the callable.
         
-        The thread progress is monitored by async_monitor.  When the thread is done, it
-        will call async_complete in the main event thread.
+        The thread progress is monitored by async_monitor, which also draws the parts of
+        the image that have changed so far.  When the thread is done, it will call 
+        async_complete in the main event thread.
         
         Parameter(s) *action: An expanded list defining the action
         Precondition: The first element of action is callable
@@ -143,6 +144,7 @@ class FilterPanel(AppPanel):
         import threading
         self.menubar.disabled = True
         self.workspace.increment()
+        self.workimage.follow(self.workspace.getCurrent())
         self.progress.value = 0
         self.async_action = Clock.schedule_interval(self.async_monitor,0.02)
         self.async_thread = threading.Thread(target=self.async_work,args=action)
@@ -172,12 +174,18 @@ class FilterPanel(AppPanel):
         """
         Updates the progress bar to represent the current processing state.
         
+        It also draws the rows modified since the last update, so that the user can see
+        the result as it forms.  Neither of these materializes the image, as the worker
+        thread may be reorienting it at the same time.
+        
         This assumes that the worker thread is updating the pixels of the current image.
         If the student is (mistakenly) modifying another image, it will not work.
         """
         if self.async_action:
             image = self.workspace.getCurrent()
-            self.progress.value = int(image.getPixels().progress()*self.progress.max)
+            self.progress.value = int(image.getPixelList().progress()*self.progress.max)
+            self.workimage.refresh(image)
+            self.canvas.ask_update()
      
     @mainthread
     def async_complete(self):
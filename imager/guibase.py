@@ -22,6 +22,7 @@ Based on an original file by Dexter Kozen (dck10) and Walker White (wmw2)
 Author: Walker M. White (wmw2)
 Date:   October 20, 2017 (Python 3 Version)
 """
+from kivy.clock import mainthread
 from kivy.properties import *
 from kivy.uix.widget import Widget
 from kivy.uix.boxlayout import BoxLayout
@@ -90,6 +91,7 @@ class ImagePanel(Widget):
             self.texture = Texture.create(size=(picture.getWidth(), picture.getHeight()), colorfmt='rgb', bufferfmt='ubyte')
             self.texture.blit_buffer(picture.getPixels().buffer, colorfmt='rgb', bufferfmt='ubyte')
             self.texture.flip_vertical()
+            picture.popDirtyRows() # Everything is on screen now
             
             if self.texture.width < self.texture.height:
                 self.imagesize[0] = int(self.inside[0]*(self.texture.width/self.texture.height))
@@ -117,22 +119,80 @@ class ImagePanel(Widget):
         """
         Returns: True if the image panel successfully displayed picture
         
-        This method is slightly faster than setImage in the case where the picture
-        is a (dimension-preserving) modification of the current one.  Otherwise it calls
-        setImage.
+        This method is faster than setImage in the case where the picture is a 
+        (dimension-preserving) modification of the current one.  Otherwise it calls
+        setImage.  If the picture is the one on display, only the rows that changed
+        since it was last drawn are copied to the texture.
         
         Parameter picture: The image to display
         Precondition: picture is an Image object or None
         """
         try:
             assert picture.getWidth() == self.texture.width
+            assert picture.getHeight() == self.texture.height
+            rows = picture.popDirtyRows() if picture is self.picture else None
             self.picture = picture
-            self.texture.blit_buffer(self.picture.getPixels().buffer, colorfmt='rgb', bufferfmt='ubyte')
+            if rows is None:
+                self.texture.blit_buffer(picture.getPixels().buffer, colorfmt='rgb', bufferfmt='ubyte')
+                picture.popDirtyRows()
+            else:
+                width = picture.getWidth()
+                for (first,last) in rows:
+                    self.texture.blit_buffer(picture.getRect(first,0,last-first,width),
+                                             pos=(0,first), size=(width,last-first),
+                                             colorfmt='rgb', bufferfmt='ubyte')
             return True
         except:
             pass
         
         return self.setImage(picture)
+    
+    def refresh(self,picture):
+        """
+        Draws the rows of picture that changed since it was last drawn.
+        
+        Unlike update, this never materializes picture or draws it in full, so it is 
+        safe to call while another thread is editing picture.  It does nothing unless
+        picture is the displayed image and is still the same size.  If drawing fails,
+        the next call to update draws the picture in full.
+        
+        Parameter picture: The image being edited
+        Precondition: picture is an Image object
+        """
+        try:
+            if picture is not self.picture:
+                return
+            width  = picture.getWidth()
+            height = picture.getHeight()
+            if width != self.texture.width or height != self.texture.height:
+                return
+            rows = picture.popDirtyRows()
+            for (first,last) in rows or []:
+                self.texture.blit_buffer(picture.getRect(first,0,last-first,width),
+                                         pos=(0,first), size=(width,last-first),
+                                         colorfmt='rgb', bufferfmt='ubyte')
+        except:
+            self.picture = None
+    
+    def follow(self,picture):
+        """
+        Makes picture the displayed image, without drawing it.
+        
+        This is for a fresh copy of the displayed image (such as a new edit in the 
+        history), which looks exactly the same.  Afterwards, update() only has to draw
+        the parts of picture that change.  If the picture is not the same size as the 
+        displayed one, this calls setImage instead.
+        
+        Parameter picture: A copy of the displayed image
+        Precondition: picture is an Image object
+        """
+        try:
+            assert picture.getWidth() == self.texture.width
+            assert picture.getHeight() == self.texture.height
+            self.picture = picture
+            picture.popDirtyRows()
+        except:
+            self.setImage(picture)
 
 
 class MessagePanel(Widget):
@@ -199,6 +259,8 @@ class AppPanel(BoxLayout):
     workspace = ObjectProperty(None,allownone=True)
     # The most recent file edit
     workimage = ObjectProperty(None,allownone=True)
+    # The progress bar (if the application has one)
+    progress  = ObjectProperty(None,allownone=True)
     
     def config(self):
         """
@@ -244,47 +306,30 @@ class AppPanel(BoxLayout):
             traceback.print_exc()
             self.error('An error occurred when trying to clear edits')
     
-    def read_image(self, file):
+    def read_image(self, file, size=None):
         """
         Returns: An Image object for the give file.
         
         If it cannot read the image (either Image is not defined or the file is not
         an image file), this method returns None.
         
+        If size is given, the result is a reduced proxy image (see imagefile.read),
+        which loads several times faster for large photos.
+        
         Parameter file: An absolute path to an image file
         Precondition: file is a string
+        
+        Parameter size: The smallest (width, height) to reduce to (or None for full size)
+        Precondition: size is None or a tuple of two ints > 0
         """
-        import pixels
-        import array
-        import a6image
-        from PIL import Image as CoreImage
-
+        import imagefile
+        
         try:
-            image = CoreImage.open(file)
-            image = image.convert("RGB")
-            flatten = []
-            for pixel in image.getdata():
-                flatten.append(pixel[0])
-                flatten.append(pixel[1])
-                flatten.append(pixel[2])
-            buffer = array.array('B',flatten)
-            size  = image.size[0]*image.size[1]
-            width = image.size[0]
+            result = imagefile.read(file,size)
         except:
             traceback.print_exc()
             self.error('Could not load the image file')
-            buffer = None
-        
-        result = None
-        if not buffer is None:
-            data = pixels.Pixels(0)
-            data._size   = size
-            data._buffer = buffer
-            try:
-                result = a6image.Image(data,width)
-            except:
-                traceback.print_exc()
-                result = None
+            result = None
         return result
     
     def place_image(self, path, filename):
@@ -402,7 +447,8 @@ class AppPanel(BoxLayout):
         Saves the current image to a file, checking first that the format is PNG
         
         If user uses another extension, or no extension at all, this method forces
-        the file to be a .png
+        the file to be a .png.  The only other extension allowed is .pix, for the
+        native format of the module imagefile (which saves and loads much faster).
         
         Parameter path: The base path to the file
         Precondition: path is a string
@@ -418,7 +464,7 @@ class AppPanel(BoxLayout):
         else:
             file = os.path.join(path,filename)
         
-        if file.lower().endswith('.png'):
+        if file.lower().endswith(('.png','.pix')):
             self.save_png(file)
         else:
             file = os.path.splitext(file)[0]+'.png'
@@ -432,10 +478,10 @@ class AppPanel(BoxLayout):
         If the file exist, this will display a warning.
         
         Parameter filename: An absolute filename
-        Precondition: filename is a string
+        Precondition: filename is a string ending in .png or .pix
         """
         import os.path
-        assert filename.lower().endswith('.png')
+        assert filename.lower().endswith(('.png','.pix'))
         self.dismiss_popup()
         if os.path.isfile(filename):
             msg = 'File {} exists.\nOverwrite?'
@@ -447,22 +493,64 @@ class AppPanel(BoxLayout):
         """
         Saves the current image, without user confirmation.
         
+        The file is compressed and written in a separate thread, so the application does
+        not freeze while saving.  The menu bar is disabled until save_complete is called.
+        The thread saves a copy of the current image, which is not affected by later 
+        edits.
+        
+        The progress bar (if any) is only a busy indicator.  PIL does not report how far
+        it has got while encoding, so the bar is emptied here and filled when the save
+        completes.
+        
         Parameter filename: An absolute filename
         Precondition: filename is a string
         """
-        import os.path
-        import traceback
+        import threading
         self.dismiss_popup()
         
-        # prepare image for saving
-        from PIL import Image as CoreImage
-
-        # This worked (Unlike Kivy)!  But is slow.
-        current = self.workspace.getCurrent()
+        current = self.workspace.getCurrent().copy()
+        self.menubar.disabled = True
+        if self.progress:
+            self.progress.value = 0
+        thread = threading.Thread(target=self.save_work,args=(current,filename))
+        thread.start()
+    
+    def save_work(self, image, filename):
+        """
+        Saves image in PNG format (or .pix format, if the filename ends in .pix).
+        
+        This is the function that is launched in a separate thread.  Even if the save
+        fails, it is guaranteed to call save_complete for clean-up.
+        
+        Parameter image: The image to save
+        Precondition: image is an Image object
+        
+        Parameter filename: An absolute filename
+        Precondition: filename is a string
+        """
+        import imagefile
         try:
-            im = CoreImage.new('RGBA',(current.getWidth(),current.getHeight()))
-            im.putdata(tuple(current.getPixels()))
-            im.save(filename,'PNG')
+            imagefile.write(image,filename)
+            success = True
         except:
             traceback.print_exc()
+            success = False
+        self.save_complete(filename,success)
+    
+    @mainthread
+    def save_complete(self, filename, success):
+        """
+        Cleans up after a save thread, reporting an error if the save failed.
+        
+        Parameter filename: An absolute filename
+        Precondition: filename is a string
+        
+        Parameter success: Whether the file was saved
+        Precondition: success is a bool
+        """
+        import os.path
+        if self.progress:
+            self.progress.value = self.progress.max
+        self.menubar.disabled = False
+        if not success:
             self.error('Cannot save image file ' + os.path.split(filename)[1])
\ No newline at end of file
@@ -0,0 +1,345 @@
+"""
+Reading and writing image files without the GUI
+
+The GUI applications load and save images through this module, but it does not depend
+on Kivy.  So scripts (and tests) can use it to process image files headless, like this:
+
+    import imagefile
+    image = imagefile.read('im_walker.png')
+
+Decoding and encoding are done by PIL, which works on the same packed RGB bytes as a
+pixel list.  No Python code ever runs per pixel.
+
+Images can also be saved in the native .pix format, which is just a short header
+followed by the raw pixel bytes.  Reading a .pix file maps it into memory instead of
+decoding it, so it is instant at any size.  This makes .pix files a good way to save
+intermediate images in a batch of edits.
+
+The most recently read images are kept in a cache, so reading the same file again
+skips the decode.  Cached pixel lists are only ever handed out as copies, which share
+their bytes until they are modified.  A file is decoded again if it changes (that is,
+if its modification time or size changes).
+"""
+import contextlib                       # Ignoring a missing temporary file
+import os
+import struct                           # The .pix file header
+from collections import OrderedDict     # The least recently used cache
+
+import a6image
+import pixels
+
+try:
+    from PIL import Image as CoreImage      # Reading and writing image files
+except ImportError:
+    CoreImage = None
+
+
+# The zlib level for saving PNG files (0 is fastest, 9 is smallest)
+PNG_LEVEL = 6
+
+# The .pix file header: the magic number, the pixel format, the width and the height
+PIX_HEADER = struct.Struct('<4s4sII')
+PIX_MAGIC  = b'PIX1'
+PIX_FORMAT = b'RGB8'
+
+# The most bytes of decoded pixels kept in the cache
+CACHE_BYTES = 128*1024*1024
+
+# The cache entries by (absolute path, size), least recently used first
+_cache = OrderedDict()
+
+
+def read(filename, size=None):
+    """
+    Returns: An Image object with the contents of the given image file
+
+    The file can be in any format that PIL can read.  It is converted to RGB (dropping
+    any transparency).  The pixel list uses the decoded bytes without copying them, and
+    makes its own copy the first time that it is modified.
+
+    If size is given, the image is reduced while it is loaded, by the largest whole
+    factor that keeps it at least that size.  JPEG files are decoded at the reduced
+    size directly (with PIL draft mode), which is several times faster than a full
+    decode.  Other formats are decoded in full and then reduced.  The result is then
+    a Proxy, which remembers the file so that it can be read in full later.
+
+    The decoded pixels are cached (see CACHE_BYTES), so reading an unchanged file
+    again only makes a copy-on-write copy of them.
+
+    A file ending in .pix is not decoded (or cached) at all.  Its pixels are a
+    MappedPixels list on the file, which is never changed by edits to the image.  The
+    size is ignored for .pix files, which are always read at full size.
+
+    This raises an OSError if the file cannot be read as an image, and an ImportError
+    if PIL is not installed.
+
+    Parameter filename: The image file
+    Precondition: filename is a string
+
+    Parameter size: The smallest (width, height) to reduce to (or None for full size)
+    Precondition: size is None or a tuple of two ints > 0
+    """
+    assert type(filename) == str, repr(filename)+' is not a string'
+    assert size is None or _is_size(size), repr(size)+' is not a valid size'
+    if _is_pix(filename):
+        return _readpix(filename)
+    key = (os.path.abspath(filename),size)
+    stat = os.stat(key[0])
+    stamp = (stat.st_mtime_ns,stat.st_size)
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == stamp:
+        _cache.move_to_end(key)
+    else:
+        entry = (stamp,)+_decode(filename,size)
+        _cache.pop(key,None)
+        if len(entry[1])*3 <= CACHE_BYTES:
+            _cache[key] = entry
+            _trim()
+    (stamp, data, width, full) = entry
+    if size is None:
+        return a6image.Image(data.copy(),width)
+    return Proxy(data.copy(),width,filename,full)
+
+
+def cacheinfo():
+    """
+    Returns: The number of images in the cache and the bytes of their pixels, as a tuple
+    """
+    return (len(_cache),sum(len(entry[1])*3 for entry in _cache.values()))
+
+
+def clearcache():
+    """
+    Removes every image from the cache.
+
+    Images that were already read are not affected.
+    """
+    _cache.clear()
+
+
+def _decode(filename, size):
+    """
+    Returns: The pixel list, width and full (width, height) of the given image file
+
+    The pixel list does not track changes.  See read for the other details.
+
+    Parameter filename: The image file
+    Precondition: filename is a string
+
+    Parameter size: The smallest (width, height) to reduce to (or None for full size)
+    Precondition: size is None or a tuple of two ints > 0
+    """
+    if CoreImage is None:
+        raise ImportError('reading image files requires PIL')
+    with CoreImage.open(filename) as image:
+        full = image.size
+        if size is not None:
+            image.draft('RGB',size)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if size is not None:
+            factor = min(image.size[0]//size[0],image.size[1]//size[1])
+            if factor > 1:
+                image = image.reduce(factor)
+        width = image.size[0]
+        data = pixels.Pixels.frombuffer(image.tobytes())
+    data.tracking = False
+    return (data,width,full)
+
+
+def _trim():
+    """
+    Removes the least recently used images from the cache until it fits CACHE_BYTES.
+    """
+    total = cacheinfo()[1]
+    while total > CACHE_BYTES:
+        (key, entry) = _cache.popitem(last=False)
+        total -= len(entry[1])*3
+
+
+def write(image, filename, level=None):
+    """
+    Saves image to the given file in PNG format (or .pix format).
+
+    The pixels are handed to PIL as a single buffer of RGB bytes.  If the image is flat
+    (see Image.isFlat), that is the byte buffer of its pixel list, so nothing is copied.
+    PNG files are saved in RGB mode, with no alpha channel (earlier versions of the GUI
+    saved RGBA files in which every pixel was opaque).
+    The compression
+    level trades speed for size: level 1 is several times faster than the default
+    level 6, for files that are only a little larger.
+
+    If the filename ends in .pix, the image is saved in the native .pix format instead,
+    with the header and the pixel bytes written as they are (the level is ignored).
+    PIL is not needed for that.  The new file replaces the old one only once it is
+    complete, so an image that is still mapped to the old file is not affected.
+
+    This raises an OSError if the file cannot be written, and an ImportError if PIL is
+    not installed.
+
+    Parameter image: The image to save
+    Precondition: image is an Image object
+
+    Parameter filename: The file to write
+    Precondition: filename is a string
+
+    Parameter level: The zlib level (or None for PNG_LEVEL)
+    Precondition: level is None or an int in 0..9
+    """
+    assert isinstance(image,a6image.Image), repr(image)+' is not an Image'
+    assert type(filename) == str, repr(filename)+' is not a string'
+    if level is None:
+        level = PNG_LEVEL
+    assert type(level) == int and 0 <= level <= 9, repr(level)+' is not a zlib level'
+    height, width = image.getHeight(), image.getWidth()
+    if image.isFlat():
+        data = image.getPixelList().buffer
+    else:
+        data = image.getRect(0,0,height,width)
+    if _is_pix(filename):
+        _writepix(data,width,height,filename)
+        return
+    if CoreImage is None:
+        raise ImportError('writing image files requires PIL')
+    result = CoreImage.frombuffer('RGB',(width,height),data,'raw','RGB',0,1)
+    result.save(filename,'PNG',compress_level=level)
+
+
+class Proxy(a6image.Image):
+    """
+    A reduced-size image that stands in for an image file
+
+    A proxy is much faster to load than the full image, and works like any other image.
+    That is enough for a preview, or for edits (like pixellate) that throw detail away
+    anyway.  The method load reads the file again in full, so that the proxy can be
+    swapped for the real image when it is needed.  Copies of a proxy are proxies too.
+
+    IMMUTABLE ATTRIBUTES (Fixed after initialization)
+        _source:   The image file [str]
+        _fullsize: The (width, height) of the full image [tuple of two ints > 0]
+    """
+
+    # GETTERS
+    def getSource(self):
+        """
+        Returns: The image file of this proxy
+        """
+        return self._source
+
+    def getFullSize(self):
+        """
+        Returns: The (width, height) of the full image in the file
+        """
+        return self._fullsize
+
+    # INITIALIZER
+    def __init__(self, data, width, source, fullsize):
+        """
+        Initializer: Creates a proxy for the given file from a reduced pixel list.
+
+        Parameter data: The reduced image data as a pixel list
+        Precondition: data is a Pixels object
+
+        Parameter width: The reduced image width
+        Precondition: width is an int > 0 and evenly divides the length of pixels
+
+        Parameter source: The image file
+        Precondition: source is a string
+
+        Parameter fullsize: The (width, height) of the full image
+        Precondition: fullsize is a tuple of two ints > 0
+        """
+        assert type(source) == str, repr(source)+' is not a string'
+        assert _is_size(fullsize), repr(fullsize)+' is not a valid size'
+        super().__init__(data,width)
+        self._source = source
+        self._fullsize = fullsize
+
+    def load(self):
+        """
+        Returns: A new Image with the full contents of the file of this proxy
+
+        The proxy itself is not changed.  Edits made to the proxy are not applied to
+        the result (but they can be replayed with the module recipe).
+
+        This raises an OSError if the file can no longer be read.
+        """
+        return read(self._source)
+
+
+def _is_size(size):
+    """
+    Returns: True if size is a (width, height) tuple, False otherwise
+
+    Parameter size: The value to check
+    Precondition: NONE
+    """
+    return (type(size) == tuple and len(size) == 2 and
+            all(type(x) == int and x > 0 for x in size))
+
+
+def _is_pix(filename):
+    """
+    Returns: True if filename names a .pix file, False otherwise
+
+    Parameter filename: The file name
+    Precondition: filename is a string
+    """
+    return os.path.splitext(filename)[1].lower() == '.pix'
+
+
+def _readpix(filename):
+    """
+    Returns: An Image mapped to the given .pix file
+
+    This raises an OSError if the file cannot be read or is not a valid .pix file.
+
+    Parameter filename: The .pix file
+    Precondition: filename is a string
+    """
+    with open(filename,'rb') as file:
+        header = file.read(PIX_HEADER.size)
+        length = os.fstat(file.fileno()).st_size-PIX_HEADER.size
+    if len(header) < PIX_HEADER.size:
+        raise OSError(filename+' is not a .pix file')
+    (magic, format, width, height) = PIX_HEADER.unpack(header)
+    if magic != PIX_MAGIC:
+        raise OSError(filename+' is not a .pix file')
+    if format != PIX_FORMAT:
+        raise OSError(filename+' has unsupported pixel format '+repr(format))
+    if width == 0 or height == 0 or width*height*3 > length:
+        raise OSError(filename+' is not a valid .pix file')
+    data = pixels.MappedPixels(filename,width*height,PIX_HEADER.size,False)
+    return a6image.Image(data,width)
+
+
+def _writepix(data, width, height, filename):
+    """
+    Writes the given pixel bytes to a .pix file.
+
+    The bytes are written to a temporary file in the same folder, which then replaces
+    the given file.  If anything fails, the temporary file is removed (if it was made)
+    and the original error is raised.
+
+    Parameter data: The pixels as packed RGB in row-major order
+    Precondition: data is a bytes-like object with 3*width*height bytes
+
+    Parameter width: The image width
+    Precondition: width is an int > 0
+
+    Parameter height: The image height
+    Precondition: height is an int > 0
+
+    Parameter filename: The .pix file
+    Precondition: filename is a string
+    """
+    temp = filename+'.'+str(os.getpid())+'.tmp'
+    try:
+        with open(temp,'wb') as file:
+            file.write(PIX_HEADER.pack(PIX_MAGIC,PIX_FORMAT,width,height))
+            file.write(data)
+        os.replace(temp,filename)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp)
+        raise
@@ -0,0 +1,253 @@
+"""
+Lookup tables for point filters
+
+A point filter is an operation where the new value of each color channel depends only
+on the old value of that pixel.  Since a channel only has 256 possible values, such a
+filter can be computed once for each value and stored in a table (a LUT).  Applying the
+table to the image is then a single call to bytes.translate, which runs in C.
+
+A table is a bytes object of length 256, where entry v is the new value for the old
+value v.  This module has functions to make common tables (such as invert, gamma, levels
+and contrast), to combine them, and to apply them to an Image.
+
+Filters that mix the color channels (like greyscale) cannot use a single table.  The
+function mix handles these with one table per channel for the weighted sum.  It uses
+NumPy if it is installed.
+"""
+try:
+    import numpy                    # Optional vectorized mixing
+except ImportError:
+    numpy = None
+
+
+def table(function):
+    """
+    Returns: The table for the given function on channel values
+
+    The results of the function are rounded and clamped to the range 0..255.
+
+    Parameter function: The function to tabulate
+    Precondition: function takes an int 0..255 and returns a number
+    """
+    return bytes(min(255,max(0,int(round(function(v))))) for v in range(256))
+
+
+def identity():
+    """
+    Returns: The table that leaves every value unchanged
+    """
+    return bytes(range(256))
+
+
+def invert():
+    """
+    Returns: The table that replaces every value with its complement (255-value)
+    """
+    return bytes(range(255,-1,-1))
+
+
+def gamma(value):
+    """
+    Returns: The table for a gamma curve
+
+    Each channel value v becomes 255*(v/255)**(1/value).  So a value greater than 1
+    brightens the middle tones, and a value less than 1 darkens them.  Black and white
+    are unchanged.
+
+    Parameter value: The gamma value
+    Precondition: value is a number > 0
+    """
+    assert isinstance(value,(int,float)) and value > 0, repr(value)+' is not a valid gamma'
+    return table(lambda v: 255*(v/255)**(1/value))
+
+
+def levels(low, high, value=1):
+    """
+    Returns: The table for a levels adjustment
+
+    The values low..high are stretched to fill 0..255.  Values below low become 0 and
+    values above high become 255.  The optional gamma value is applied afterwards.
+
+    Parameter low: The value that becomes black
+    Precondition: low is an int 0..255
+
+    Parameter high: The value that becomes white
+    Precondition: high is an int 0..255 with high > low
+
+    Parameter value: The gamma value for the middle tones
+    Precondition: value is a number > 0
+    """
+    assert isinstance(low,int) and 0 <= low <= 255, repr(low)+' is not a valid level'
+    assert isinstance(high,int) and low < high <= 255, repr(high)+' is not a valid level'
+    assert isinstance(value,(int,float)) and value > 0, repr(value)+' is not a valid gamma'
+    def stretch(v):
+        v = min(1,max(0,(v-low)/(high-low)))
+        return 255*v**(1/value)
+    return table(stretch)
+
+
+def contrast(amount):
+    """
+    Returns: The table for a contrast adjustment
+
+    Each channel value v becomes 128+amount*(v-128).  So an amount greater than 1 adds
+    contrast, and an amount between 0 and 1 removes it.
+
+    Parameter amount: The contrast factor
+    Precondition: amount is a number >= 0
+    """
+    assert isinstance(amount,(int,float)) and amount >= 0, repr(amount)+' is not a valid amount'
+    return table(lambda v: 128+amount*(v-128))
+
+
+def compose(*tables):
+    """
+    Returns: The table that applies the given tables one after another
+
+    Applying the result is the same as applying each table in order, but only takes
+    one pass over the image.
+
+    Parameter tables: The tables to combine
+    Precondition: each table is a bytes object of length 256
+    """
+    result = identity()
+    for item in tables:
+        assert _is_table(item), repr(item)+' is not a table'
+        result = result.translate(item)
+    return result
+
+
+def apply(image, red, green=None, blue=None):
+    """
+    Applies a table to each color channel of image.
+
+    If green or blue is None, that channel uses the red table.  When all three tables
+    are the same, each band of the image is translated at once.  Otherwise, each
+    channel is translated on its own (channels with the identity table are skipped).
+    The image is processed one band at a time (see Image.bands), so it is never copied
+    in full.
+
+    Parameter image: The image to modify
+    Precondition: image is an Image object
+
+    Parameter red: The table for the red channel
+    Precondition: red is a bytes object of length 256
+
+    Parameter green: The table for the green channel
+    Precondition: green is None or a bytes object of length 256
+
+    Parameter blue: The table for the blue channel
+    Precondition: blue is None or a bytes object of length 256
+    """
+    green = red if green is None else green
+    blue  = red if blue is None else blue
+    for item in (red,green,blue):
+        assert _is_table(item), repr(item)+' is not a table'
+
+    unchanged = identity()
+    tables = [(channel,item) for (channel,item) in enumerate((red,green,blue))
+              if item != unchanged]
+    if not tables:
+        return
+    for band in image.bands():
+        data = image.getRect(*band)
+        if red == green == blue:
+            result = data.translate(red)
+        else:
+            result = bytearray(data)
+            for (channel,item) in tables:
+                result[channel::3] = data[channel::3].translate(item)
+        image.setRect(*band,result)
+
+
+def mix(image, weights, scales=(1,1,1)):
+    """
+    Replaces each pixel of image with a scaled copy of its weighted brightness.
+
+    The brightness of a pixel (r,g,b) is r*weights[0]+g*weights[1]+b*weights[2].  The
+    new pixel is the brightness times each scale, rounded and clamped to 0..255.  So
+    the weights (0.3,0.6,0.1) give greyscale, and the scales (1,0.6,0.4) then give sepia.
+
+    The products for each channel come from tables, so the only work per pixel is the
+    sum.  This is done with NumPy if it is installed, and in Python otherwise.  The 
+    image is processed one band at a time (see Image.bands), so it is never copied in 
+    full.
+
+    Parameter image: The image to modify
+    Precondition: image is an Image object
+
+    Parameter weights: The weight of each channel in the brightness
+    Precondition: weights is a 3-element tuple of numbers
+
+    Parameter scales: The factor for each channel of the result
+    Precondition: scales is a 3-element tuple of numbers
+    """
+    assert len(weights) == 3, repr(weights)+' is not three weights'
+    assert len(scales) == 3, repr(scales)+' is not three scales'
+    for band in image.bands():
+        data = image.getRect(*band)
+        if numpy is None:
+            result = _mix_python(data,weights,scales)
+        else:
+            result = _mix_numpy(data,weights,scales)
+        image.setRect(*band,result)
+
+
+# HELPER FUNCTIONS
+def _is_table(item):
+    """
+    Returns: True if item is a table, False otherwise
+
+    Parameter item: The value to check
+    Precondition: NONE
+    """
+    return isinstance(item,bytes) and len(item) == 256
+
+
+def _mix_numpy(data, weights, scales):
+    """
+    Returns: The bytes for mix, computed with NumPy
+
+    Parameter data: The pixels to mix as packed RGB
+    Precondition: data is a bytes object
+
+    Parameter weights: The weight of each channel in the brightness
+    Precondition: weights is a 3-element tuple of numbers
+
+    Parameter scales: The factor for each channel of the result
+    Precondition: scales is a 3-element tuple of numbers
+    """
+    source = numpy.frombuffer(data,dtype=numpy.uint8).reshape(-1,3)
+    values = numpy.arange(256,dtype=numpy.float64)
+    reds, greens, blues = (values*w for w in weights)
+    brightness = reds[source[:,0]]+greens[source[:,1]]+blues[source[:,2]]
+    result = numpy.empty_like(source)
+    for channel in range(3):
+        scaled = brightness if scales[channel] == 1 else brightness*scales[channel]
+        result[:,channel] = numpy.clip(numpy.rint(scaled),0,255)
+    return result.tobytes()
+
+
+def _mix_python(data, weights, scales):
+    """
+    Returns: The bytes for mix, computed in Python
+
+    Parameter data: The pixels to mix as packed RGB
+    Precondition: data is a bytes object
+
+    Parameter weights: The weight of each channel in the brightness
+    Precondition: weights is a 3-element tuple of numbers
+
+    Parameter scales: The factor for each channel of the result
+    Precondition: scales is a 3-element tuple of numbers
+    """
+    reds, greens, blues = ([v*w for v in range(256)] for w in weights)
+    brightness = [reds[r]+greens[g]+blues[b] for (r,g,b) in zip(data[0::3],data[1::3],data[2::3])]
+    result = bytearray(len(data))
+    for (channel,scale) in enumerate(scales):
+        values = brightness if scale == 1 else [x*scale for x in brightness]
+        values = list(map(round,values))
+        if values and (min(values) < 0 or max(values) > 255):
+            values = [min(255,max(0,x)) for x in values]
+        result[channel::3] = bytes(values)
+    return bytes(result)
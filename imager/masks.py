@@ -0,0 +1,142 @@
+"""
+Cached weight masks for position-dependent filters
+
+Some filters (like vignetting) scale each pixel by a weight that depends only on its
+position and on the size of the image.  This module computes such a mask once for each
+image size and keeps the most recently used ones (up to CACHE_BYTES of them), so that
+applying the same filter to several images of the same size (like the frames of a
+batch) skips that work.
+
+A mask is a flat sequence of height*width float weights in row-major order, stored as
+8-byte floats.  It is a read-only NumPy array if NumPy is installed, and a read-only
+memoryview of an array otherwise.  Masks are shared between callers, which is why they
+cannot be modified.  The weights are doubles (like Python floats), so that filters give
+exactly the same results with or without NumPy.
+"""
+from array import array             # Masks without NumPy
+from collections import OrderedDict # The least recently used cache
+from operator import mul
+
+try:
+    import numpy                    # Optional vectorized masks
+except ImportError:
+    numpy = None
+
+
+# The most bytes of masks kept in the cache
+CACHE_BYTES = 64*1024*1024
+
+# The cached masks by (name, width, height), least recently used first
+_cache = OrderedDict()
+
+
+def vignette(width, height):
+    """
+    Returns: The vignette mask for an image of the given size
+
+    The weight of the pixel at (row, col) is
+
+        1 - (d / hfD)^2
+
+    where d is the distance from the pixel to the center of the image and hfD (for half
+    diagonal) is the distance from the center of the image to any of the corners.
+
+    Parameter width: The image width
+    Precondition: width is an int > 0
+
+    Parameter height: The image height
+    Precondition: height is an int > 0
+    """
+    assert isinstance(width,int) and width > 0, repr(width)+' is not a valid width'
+    assert isinstance(height,int) and height > 0, repr(height)+' is not a valid height'
+    key  = ('vignette',width,height)
+    mask = _cache.get(key)
+    if mask is not None:
+        _cache.move_to_end(key)
+        return mask
+
+    hfD = (width/2)**2+(height/2)**2
+    if numpy is None:
+        cols = [(col-width/2)**2 for col in range(width)]
+        mask = array('d')
+        for row in range(height):
+            rows = (row-height/2)**2
+            mask.extend([1-(rows+cols[col])/hfD for col in range(width)])
+        mask = memoryview(mask).toreadonly()
+    else:
+        rows = (numpy.arange(height,dtype=numpy.float64)-height/2)**2
+        cols = (numpy.arange(width,dtype=numpy.float64)-width/2)**2
+        mask = (1-(rows[:,None]+cols[None,:])/hfD).reshape(-1)
+        mask.flags.writeable = False
+    return _keep(key,mask)
+
+
+def cacheinfo():
+    """
+    Returns: The number of masks in the cache and their bytes, as a tuple
+    """
+    return (len(_cache),sum(mask.nbytes for mask in _cache.values()))
+
+
+def clearcache():
+    """
+    Removes every mask from the cache.
+
+    Masks that were already returned are not affected.
+    """
+    _cache.clear()
+
+
+def _keep(key, mask):
+    """
+    Returns: mask, after adding it to the cache (if it fits)
+
+    The least recently used masks are removed until the cache fits CACHE_BYTES.  A mask
+    that is larger than that on its own is not cached at all.
+
+    Parameter key: The cache key
+    Precondition: key is a tuple (name, width, height)
+
+    Parameter mask: The new mask
+    Precondition: mask is a mask (from this module)
+    """
+    if mask.nbytes <= CACHE_BYTES:
+        _cache[key] = mask
+        total = cacheinfo()[1]
+        while total > CACHE_BYTES:
+            (oldest, entry) = _cache.popitem(last=False)
+            total -= entry.nbytes
+    return mask
+
+
+def apply(image, mask):
+    """
+    Multiplies every pixel of image by its weight in mask.
+
+    Each color value is multiplied by the weight of its pixel (as a double), rounded to
+    the nearest int (halves to even, like round) and clamped to 0..255.  The image is 
+    processed one band at a time (see Image.bands), so it is never copied in full.
+
+    Parameter image: The image to modify
+    Precondition: image is an Image object
+
+    Parameter mask: The weights for the image
+    Precondition: mask is a mask (from this module) for the size of image
+    """
+    height, width = image.getHeight(), image.getWidth()
+    assert len(mask) == width*height, 'mask is not the size of the image'
+    for band in image.bands():
+        weights = mask[band[0]*width:(band[0]+band[2])*width]
+        data = image.getRect(*band)
+        if numpy is None:
+            result = bytearray(len(data))
+            for channel in range(3):
+                values = list(map(round,map(mul,weights,data[channel::3])))
+                if values and (min(values) < 0 or max(values) > 255):
+                    values = [min(255,max(0,x)) for x in values]
+                result[channel::3] = bytes(values)
+        else:
+            source = numpy.frombuffer(data,dtype=numpy.uint8).reshape(-1,3)
+            result = numpy.clip(numpy.rint(weights[:,None]*source),0,255)
+            result = result.astype(numpy.uint8).tobytes()
+        image.setRect(*band,result)
@@ -0,0 +1,105 @@
+"""
+Multi-process execution of image operations
+
+Python threads cannot run image operations at the same time, because of the global
+interpreter lock.  This module gets around that by running an operation in several
+worker processes instead.  The image is placed in shared memory (see SharedPixels in
+the module pixels), and each worker attaches to it by name and processes its own band
+of rows.  No pixel data is pickled or sent between the processes.
+
+An operation is any module-level function with the signature
+
+    function(image, start, stop, *args)
+
+that modifies only the rows start..stop-1 of the given Image object.  It must be
+defined at module level so that the workers can find it.
+"""
+import multiprocessing
+
+import a6image
+import pixels
+
+
+def bands(height, count):
+    """
+    Returns: A list of (start, stop) row ranges that split height rows into count bands
+
+    The bands are as equal in size as possible, and cover every row exactly once.  There
+    are never more bands than rows.
+
+    Parameter height: The number of rows
+    Precondition: height is an int >= 0
+
+    Parameter count: The number of bands wanted
+    Precondition: count is an int > 0
+    """
+    assert isinstance(height,int) and height >= 0, repr(height)+' is not a valid height'
+    assert isinstance(count,int) and count > 0, repr(count)+' is not a valid count'
+    count = min(count,height)
+    return [(height*k//count,height*(k+1)//count) for k in range(count)]
+
+
+def run(function, image, *args, processes=None):
+    """
+    Applies function to image, splitting the rows among several processes.
+
+    If the image is not already stored in shared memory, it is copied there for the
+    duration of the operation and the result is copied back afterwards.  The image is
+    marked as modified when the operation completes (the workers do not update the
+    progress monitor as they go).
+
+    Parameter function: The operation to apply
+    Precondition: function is a module-level function function(image, start, stop, *args)
+
+    Parameter image: The image to modify
+    Precondition: image is an Image object
+
+    Parameter args: Additional arguments for function
+    Precondition: args can be pickled
+
+    Parameter processes: The number of worker processes (None means one per CPU)
+    Precondition: processes is None or an int > 0
+    """
+    assert isinstance(image,a6image.Image), repr(image)+' is not an Image'
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    data = image.getPixels()
+    shared = data if isinstance(data,pixels.SharedPixels) else None
+    if shared is None:
+        shared = pixels.SharedPixels(len(data))
+        shared.setspan(0,data.buffer)
+    else:
+        # Workers write to the block directly, so it must not be shared with copies
+        shared._own()
+
+    tasks = [(function,shared.name,len(data),image.getWidth(),start,stop,args)
+             for (start,stop) in bands(image.getHeight(),processes)]
+    try:
+        if tasks:
+            with multiprocessing.Pool(len(tasks)) as pool:
+                pool.map(_work,tasks)
+        if shared is data:
+            data._mark(0,len(data))
+        else:
+            data.setspan(0,shared.buffer)
+    finally:
+        if not shared is data:
+            shared.close()
+            shared.unlink()
+
+
+def _work(task):
+    """
+    Runs a single band of an operation in a worker process.
+
+    Parameter task: The band to process
+    Precondition: task is a tuple (function, name, size, width, start, stop, args)
+    """
+    function, name, size, width, start, stop, args = task
+    data = pixels.SharedPixels(size,name)
+    data.tracking = False
+    try:
+        function(a6image.Image(data,width),start,stop,*args)
+    finally:
+        data.close()
@@ -12,7 +12,20 @@ Author: Walker M. White (wmw2)
 Date:   October 20, 2017
 """
 from array import array             # Byte buffers
+from contextlib import nullcontext  # Packing without a lock
+import hashlib                      # Content addresses of tiles
 from io import StringIO             # Making complex strings
+import mmap                         # Memory-mapped files
+import os                           # File sizes
+import tempfile                     # Scratch files for mapped copies
+import threading                    # Reading dirty spans while an operation runs
+import zlib                         # Compressing spilled contents
+from multiprocessing import shared_memory   # Buffers shared between processes
+
+try:
+    import numpy                    # Optional vectorized storage
+except ImportError:
+    numpy = None
 
 
 class Pixels(object):
@@ -23,6 +36,11 @@ class Pixels(object):
     way that matters.  It has no public attributes other than the buffer property, 
     which allows direct access to the underlying byte buffer.
     
+    Other libraries (like PIL, NumPy or sockets) can share the pixel data without copying
+    it.  The method view() returns a memoryview of the data with one row per pixel, and 
+    the class method frombuffer() creates a pixel list on top of any bytes-like object.
+    In Python 3.12 or later, memoryview(pixels) works directly as well.
+    
     Any initialization of this class creates an empty pixel list (of the requested size).
     Initialization of this list happens in other modules (to separate the logic).
     
@@ -30,18 +48,83 @@ class Pixels(object):
     tuples, which are lists that cannot be modified (so you can slice them to get new
     tuples, but not assign or append to them).
     
+    Copying a pixel list with the method copy() is cheap, because the copy shares the
+    byte buffer with the original.  The first time either of them is modified, that one
+    makes a private copy of the buffer (copy-on-write).  Values computed from the pixels
+    (like summed-area tables) can be cached with setcached().  They are shared with the
+    copies (and with the list if it is stored in some other way, like a delta), and 
+    forgotten when the pixels change.
+    
     The methods progress() and unmark() are used to track changes to this pixel list.
     These methods are used by the progress bar to display how much of the image has
-    been modified.
+    been modified.  Change tracking uses one byte per pixel.  Headless programs that do
+    not need a progress bar can turn it off with the tracking property, or turn it off 
+    for all new pixel lists by setting the class attribute TRACK_CHANGES to False.
+    
+    Change tracking also records which parts of the list have been modified, as a short
+    list of merged (start,stop) spans.  The method popdirty() returns and forgets these
+    spans, so that the GUI can redisplay just the parts of an image that changed.
+    
+    A pixel list that is kept only for reference (like an old edit in the history) can
+    be stored as a delta with makedelta().  A delta keeps just the pixels that differ
+    from another pixel list, and rebuilds the rest of its buffer when it is needed.
+    The method pack() compresses the contents in memory instead, and spill() moves 
+    them to a compressed file on disk until they are needed.  The method dedupe() 
+    splits the contents into tiles kept in a TileStore, which stores each distinct 
+    tile only once.  The method footprint() reports the memory these use, and 
+    exclusive() reports how much of it spilling would free.
     """
     
+    # Whether new pixel lists track changes for the progress monitor
+    TRACK_CHANGES = True
+    
+    # The most dirty spans to keep before merging them together
+    MAX_DIRTY = 32
+    
+    # The number of pixels compared at a time when looking for changes
+    DIFF_CHUNK = 4096
+    
+    # The zlib compression level for packed and spilled contents (1 is fastest)
+    ZLIB_LEVEL = 1
+    
+    # Whether the change markers may have missed some changes since the list was copied
+    _untracked = False
+    
+    # Whether a writable view of the byte buffer has been handed out
+    _exported = False
+    
     @property
     def buffer(self):
         """
         The underlying byte buffer
+        
+        This buffer may be shared with copies of this pixel list, so it should only be
+        used for reading (e.g. to display the image).
         """
         return self._buffer
     
+    @property
+    def tracking(self):
+        """
+        Whether this pixel list tracks changes for the progress monitor
+        
+        Turning tracking off frees the change markers, progress() will return 0 and
+        popdirty() will return None until it is turned back on.  Turning tracking on starts from a clean slate.
+        The value must be a bool.
+        """
+        return self._marker is not None
+    
+    @tracking.setter
+    def tracking(self,value):
+        assert type(value) == bool, repr(value)+' is not a bool'
+        # Restarting the markers forgets the changes made before
+        self._untracked = '_marker' in self.__dict__
+        self._marker = bytearray(self._size) if value else None
+        self._change = 0
+        self._dirty  = [] if value else None
+        self._span   = _NO_SPAN
+        self._lock   = threading.Lock()
+    
     # INITIALIZER
     def __init__(self,size):
         """
@@ -57,8 +140,9 @@ class Pixels(object):
         assert size >= 0, repr(size)+' is negative'
         
         self._size   = size
-        self._buffer = array('B',[0]*size*3)
-        self.unmark()
+        self._buffer = array('B',bytes(size*3))
+        self._owners = [1]
+        self.tracking = self.TRACK_CHANGES
     
     # DISPLAY METHODS
     def __str__(self):
@@ -115,20 +199,20 @@ class Pixels(object):
             b = self._buffer[index*3+2]
             return (r,g,b)
         elif type(index) == slice:
-            start = 0 if index.start is None else index.start
-            stop  = self._size if index.stop is None else index.stop
+            start, stop, step = index.indices(self._size)
+            count = len(range(start,stop,step))
             # Time to make a copy
-            if index.step is None:
-                result = Pixels(stop-start)
-                result._buffer = self._buffer[start*3:stop*3]
+            result = self._empty(count)
+            if count == 0:
+                return result
+            source = memoryview(self._buffer)
+            target = memoryview(result._buffer)
+            if step == 1:
+                target[:] = source[start*3:stop*3]
             else:
-                result = Pixels(len(range(start,stop,index.step)))
-                opos = 0
-                for npos in range(start,stop,index.step):
-                    result._buffer[opos*3  ] = self._buffer[npos*3  ]
-                    result._buffer[opos*3+1] = self._buffer[npos*3+1]
-                    result._buffer[opos*3+2] = self._buffer[npos*3+2]
-                    opos += 1
+                # One strided copy per color channel, instead of one per pixel
+                for channel in range(3):
+                    target[channel::3] = source[self._stride(start,step,count,3,channel)]
             return result
         else:
             raise TypeError('pixel indices must be integers or slices, not '+repr(type(index)))
@@ -149,41 +233,60 @@ class Pixels(object):
         Precondition: index must be a tuple or a list of tuples
         """
         if type(index) == int:
+            owners = self._owners
+            if owners[0] > 1 or len(owners) > 1:
+                self._own()
             try:
-                self._buffer[index*3  ] = value[0]
-                self._buffer[index*3+1] = value[1]
-                self._buffer[index*3+2] = value[2]
-                if not self._marker[index]:
-                    self._marker[index] = 1
-                    self._change += 1
+                buffer = self._buffer
+                pos = index*3
+                buffer[pos  ] = value[0]
+                buffer[pos+1] = value[1]
+                buffer[pos+2] = value[2]
+                marker = self._marker
+                if marker is not None:
+                    if not marker[index]:
+                        marker[index] = 1
+                        self._change += 1
+                    span = self._span
+                    if span[1] == index:
+                        span[1] += 1
+                    elif not span[0] <= index < span[1]:
+                        self._touch(index,index+1)
             except IndexError:
                 raise IndexError(repr(index)+' is not a valid pixel index')
             except:
                 raise ValueError(repr(value)+' is not a valid pixel')
         elif type(index) == slice:
-            if not type(value) == Pixels:
+            if not isinstance(value,Pixels):
                 raise ValueError('attempt to assign a non-pixel sequence to a slice')
-            size = len(range(index.start,index.stop,index.step))
+            start, stop, step = index.indices(self._size)
+            size = len(range(start,stop,step))
+            self._own()
             if len(value) == size:
-                npos = 0
-                for opos in range(index.start,index.stop,index.step):
-                    self._buffer[opos*3  ] = value._buffer[npos*3  ]
-                    self._buffer[opos*3+1] = value._buffer[npos*3+1]
-                    self._buffer[opos*3+2] = value._buffer[npos*3+2]
-                    npos += 1
-                    if not self._marker[opos]:
-                        self._marker[opos] = 1
-                        self._change += 1
-            elif index.step is None:
-                self._buffer[index.start*3:index.stop*3] = value._buffer
+                if size == 0:
+                    return
+                source = memoryview(value._buffer)
+                target = memoryview(self._buffer)
+                if step == 1:
+                    target[start*3:stop*3] = source[:size*3]
+                    self._mark(start,stop)
+                else:
+                    # One strided copy per color channel, instead of one per pixel
+                    for channel in range(3):
+                        target[self._stride(start,step,size,3,channel)] = source[channel::3]
+                    self._markstride(start,step,size)
+            elif step == 1:
+                if not isinstance(self._buffer,array):
+                    raise ValueError('this pixel list cannot change size')
+                self._buffer[start*3:stop*3] = array('B',memoryview(value._buffer).tobytes())
                 self._size = len(self._buffer)//3
                 
-                prev = 0
-                for pos in range(index.start,index.stop):
-                    if self._marker[pos]:
-                        prev += 1
-                self._marker[index.start:index.stop] = [1]*len(value)
-                self._change += len(value)-prev
+                if self._marker is not None:
+                    prev = self._marker.count(1,start,stop)
+                    self._marker[start:stop] = b'\x01'*len(value)
+                    self._change += len(value)-prev
+                    self._dirty  = [[start,self._size]]
+                    self._span   = _NO_SPAN
             else:
                 raise ValueError('attempt to assign sequence of size '+str(len(value))+' to extended slice of size '+str(size))
         else:
@@ -197,24 +300,1679 @@ class Pixels(object):
         """
         return _PixelIterator(self)
     
+    # BUFFER PROTOCOL
+    @classmethod
+    def frombuffer(cls,data):
+        """
+        Returns: A pixel list that uses data as its byte buffer, without copying it
+        
+        The data is packed RGB, 3 bytes per pixel.  Changes to the pixel list change 
+        data, and vice versa.  So data is treated like a writable view that has been 
+        handed out (see view): copies get their own buffer right away, and nothing is
+        cached.  If data is read-only (like a bytes object), the pixel list still works,
+        but makes its own copy the first time that it is modified.
+        
+        This works for Pixels and NumpyPixels, but not for the other pixel lists (whose
+        storage has to be created by the class itself), which raise a TypeError.
+        
+        Parameter data: The pixel data
+        Precondition: data is a contiguous bytes-like object whose length is a multiple of 3
+        """
+        view = memoryview(data).cast('B')
+        if len(view) % 3 != 0:
+            raise ValueError('buffer of '+str(len(view))+' bytes is not a list of pixels')
+        result = cls(0)
+        result._size = len(view)//3
+        result._setbuffer(view)
+        # Read-only data is treated like a buffer shared with a copy
+        result._owners = [2 if view.readonly else 1]
+        result._exported = not view.readonly
+        result.tracking = result.TRACK_CHANGES
+        return result
+    
+    def view(self):
+        """
+        Returns: A memoryview of the pixel data, with shape (len(self), 3)
+        
+        The view is not a copy; writing to it changes this pixel list (but is not 
+        tracked by the progress monitor).  Since the view can be written to, this pixel
+        list stops sharing its buffer with any copies first, and later copies get their
+        own buffer right away.  An empty pixel list gives an empty view with no shape.
+        """
+        self._own()
+        self._untracked = True
+        self._exported  = True
+        if self._size == 0:
+            return memoryview(b'')
+        return memoryview(self._buffer).cast('B',(self._size,3))
+    
+    def __buffer__(self,flags):
+        """
+        Returns: A memoryview for the buffer protocol (Python 3.12 or later)
+        
+        Parameter flags: The buffer request flags
+        Precondition: flags is an int
+        """
+        return self.view()
+    
+    def _setbuffer(self,view):
+        """
+        Makes view the byte buffer of this pixel list.
+        
+        Parameter view: The new byte buffer
+        Precondition: view is a 1-dimensional memoryview of bytes with 3*len(self) bytes
+        """
+        self._buffer = view
+    
+    # CACHING
+    def getcached(self,key):
+        """
+        Returns: The value cached for key with setcached, or None if there is none
+        
+        A cached value belongs to the current contents of the byte buffer.  So it is 
+        shared with every copy that still has the same contents (even if it no longer 
+        shares the buffer, see unpack), and it is forgotten as soon as this pixel list 
+        is modified.
+        
+        Parameter key: The cache key
+        Precondition: key is hashable
+        """
+        owners = self._owners
+        return owners[1].get(key) if len(owners) > 1 else None
+    
+    def setcached(self,key,value):
+        """
+        Caches a value computed from the current contents of this pixel list.
+        
+        The cache lives next to the copy count of the byte buffer (but does not count as
+        a copy).  Every modification goes through _own(), which forgets the cache for 
+        this list only.  A list that stops sharing the buffer without being modified 
+        (see unpack and makedelta) keeps sharing the cache.  The cached values count 
+        towards footprint().
+        
+        Nothing is cached while a writable view of this list is handed out (see view), 
+        as the view could change the pixels without forgetting the cache.
+        
+        Parameter key: The cache key
+        Precondition: key is hashable
+        
+        Parameter value: The value to cache
+        Precondition: NONE
+        """
+        if self._exported:
+            return
+        owners = self._owners
+        with _COUNT_LOCK:
+            if len(owners) == 1:
+                owners.append({})
+            owners[1][key] = value
+    
+    def _dropcache(self):
+        """
+        Forgets any cached values (for every copy sharing the byte buffer).
+        
+        Lists that only share the cache (not the buffer) keep it.
+        """
+        owners = self._owners
+        with _COUNT_LOCK:
+            del owners[1:]
+    
+    # COPYING
+    def copy(self):
+        """
+        Returns: A copy of this pixel list.
+        
+        The copy is a new pixel list object with the same contents, but it does not copy
+        the byte buffer yet.  Instead the two lists share the buffer until one of them 
+        is modified, at which point that list makes its own copy.  So copying is fast,
+        and a copy that is never modified costs almost no memory.
+        
+        If a writable view of this list has been handed out (see view), the copy gets its
+        own buffer right away instead, as the view could still change a shared buffer.
+        
+        The copy starts with a fresh progress monitor.
+        """
+        result = object.__new__(type(self))
+        result.__dict__.update(self.__dict__)
+        if self._exported:
+            result._owners   = [1]
+            result._exported = False
+            result._copybuffer()
+        else:
+            with _COUNT_LOCK:
+                self._owners[0] += 1
+        result.tracking = result.TRACK_CHANGES
+        result._untracked = False
+        return result
+    
+    def __del__(self):
+        """
+        Releases this pixel list's share of its byte buffer
+        """
+        owners = self.__dict__.get('_owners')
+        if owners:
+            with _COUNT_LOCK:
+                owners[0] -= 1
+    
+    def _release(self):
+        """
+        Gives up this pixel list's share of its byte buffer to the copies sharing it.
+        
+        The list must not be used afterwards (it is called by close).
+        """
+        owners = self._owners
+        self._owners = [1]
+        with _COUNT_LOCK:
+            owners[0] -= 1
+    
+    def _own(self):
+        """
+        Makes sure that this pixel list is the only user of its byte buffer.
+        
+        If the buffer is shared with a copy, this gives this list a private copy of the
+        buffer.  It also forgets any cached values, as they are about to change.  This 
+        must be called before any modification of the buffer.
+        """
+        self._detach()
+        if len(self._owners) > 1:
+            self._dropcache()
+    
+    def _detach(self):
+        """
+        Gives this pixel list a private copy of its byte buffer, if it is shared.
+        
+        The contents do not change, so the list keeps sharing any cached values.
+        """
+        owners = self._owners
+        if owners[0] > 1:
+            self._copybuffer()
+            with _COUNT_LOCK:
+                self._owners = [1]+owners[1:]
+                owners[0] -= 1
+    
+    def _copybuffer(self):
+        """
+        Replaces the byte buffer with a private copy of its contents.
+        """
+        buffer = array('B')
+        buffer.frombytes(memoryview(self._buffer))
+        self._buffer = buffer
+    
+    # BULK ACCESS METHODS
+    def getspan(self,start,count,step=1):
+        """
+        Returns: The raw bytes of count pixels, starting at position start.
+        
+        The bytes are packed RGB, so the result has 3*count bytes.  This is much faster
+        than slicing, since it does not create any tuples.  If step is not 1, the pixels 
+        read are start, start+step, start+2*step and so on.  So a step equal to the 
+        image width reads a column, and a step of -1 reads a row backwards.
+        
+        Parameter start: The first pixel position
+        Precondition: start is an int, 0 <= start <= len(self)
+        
+        Parameter count: The number of pixels to read
+        Precondition: count is an int >= 0 and every pixel read is in this list
+        
+        Parameter step: The distance between pixels
+        Precondition: step is a nonzero int
+        """
+        assert self._fits(start,count,step), _span_error(start,count,step)
+        if step == 1:
+            return memoryview(self._buffer)[start*3:(start+count)*3].tobytes()
+        if count == 0:
+            return b''
+        result = bytearray(count*3)
+        source = memoryview(self._buffer)
+        target = memoryview(result)
+        for channel in range(3):
+            target[channel::3] = source[self._stride(start,step,count,3,channel)]
+        return bytes(result)
+    
+    def setspan(self,start,data,step=1):
+        """
+        Replaces pixels, starting at position start, with the given raw bytes.
+        
+        The bytes must be packed RGB, so data sets len(data)//3 pixels.  If step is not
+        1, the pixels set are start, start+step, start+2*step and so on.
+        
+        Parameter start: The first pixel position
+        Precondition: start is an int, 0 <= start <= len(self)
+        
+        Parameter data: The new pixel data
+        Precondition: data is a bytes-like object whose length is a multiple of 3 and 
+        every pixel written is in this list
+        
+        Parameter step: The distance between pixels
+        Precondition: step is a nonzero int
+        """
+        count = len(data)//3
+        if count*3 != len(data):
+            raise ValueError('span of '+str(len(data))+' bytes is not a list of pixels')
+        assert self._fits(start,count,step), _span_error(start,count,step)
+        if count == 0:
+            return
+        self._own()
+        target = memoryview(self._buffer)
+        if step == 1:
+            target[start*3:(start+count)*3] = data
+            self._mark(start,start+count)
+        else:
+            source = memoryview(data).cast('B')
+            for channel in range(3):
+                target[self._stride(start,step,count,3,channel)] = source[channel::3]
+            self._markstride(start,step,count)
+    
+    def fillspan(self,start,count,pixel):
+        """
+        Sets count pixels, starting at position start, to the same value.
+        
+        Parameter start: The first pixel position
+        Precondition: start is an int, 0 <= start <= len(self)
+        
+        Parameter count: The number of pixels to set
+        Precondition: count is an int >= 0 with start+count <= len(self)
+        
+        Parameter pixel: The pixel value
+        Precondition: pixel is a 3-element tuple (r,g,b) where each value is 0..255
+        """
+        try:
+            run = bytes(pixel[:3])*count
+        except:
+            raise ValueError(repr(pixel)+' is not a valid pixel')
+        self.setspan(start,run)
+    
+    def getchannel(self,channel):
+        """
+        Returns: The values of a single color channel as bytes.
+        
+        The result has one byte per pixel.  Channel 0 is red, 1 is green and 2 is blue.
+        
+        Parameter channel: The color channel
+        Precondition: channel is 0, 1, or 2
+        """
+        assert channel in (0,1,2), repr(channel)+' is not a valid channel'
+        return memoryview(self._buffer)[channel::3].tobytes()
+    
+    def setchannel(self,channel,data):
+        """
+        Replaces the values of a single color channel.
+        
+        Parameter channel: The color channel
+        Precondition: channel is 0, 1, or 2
+        
+        Parameter data: The new channel values, one byte per pixel
+        Precondition: data is a bytes-like object with len(self) bytes
+        """
+        assert channel in (0,1,2), repr(channel)+' is not a valid channel'
+        if len(data) != self._size:
+            raise ValueError('channel data has '+str(len(data))+' bytes, not '+str(self._size))
+        self._own()
+        memoryview(self._buffer)[channel::3] = data
+        self._mark(0,self._size)
+    
+    # STORAGE HELPERS
+    def _fits(self,start,count,step):
+        """
+        Returns: True if the positions start, start+step, ... (count in all) are valid
+        
+        A position is valid if it is in 0..len(self)-1.  An empty span (count 0) may 
+        also start at len(self).
+        
+        Parameter start: The first pixel position
+        Precondition: NONE (this method checks it)
+        
+        Parameter count: The number of pixels
+        Precondition: NONE (this method checks it)
+        
+        Parameter step: The distance between pixels
+        Precondition: NONE (this method checks it)
+        """
+        if type(start) != int or type(count) != int or type(step) != int:
+            return False
+        if step == 0 or count < 0:
+            return False
+        if count == 0:
+            return 0 <= start <= self._size
+        last = start+(count-1)*step
+        return 0 <= start < self._size and 0 <= last < self._size
+    
+    def _stride(self,start,step,count,scale=1,offset=0):
+        """
+        Returns: A slice for the positions start, start+step, ... (count in all)
+        
+        The positions are scaled by scale and shifted by offset, so that with scale 3 
+        the slice picks out a single color channel of those pixels in the byte buffer.
+        Unlike the slice start:stop:step, the result is safe to use with negative steps
+        that run all the way to position 0.
+        
+        Parameter start: The first pixel position
+        Precondition: start is an int >= 0
+        
+        Parameter step: The distance between pixels
+        Precondition: step is a nonzero int
+        
+        Parameter count: The number of pixels
+        Precondition: count is an int > 0 and start+(count-1)*step >= 0
+        
+        Parameter scale: The number of entries per pixel
+        Precondition: scale is an int > 0
+        
+        Parameter offset: The entry within each pixel
+        Precondition: offset is an int, 0 <= offset < scale
+        """
+        first = start*scale+offset
+        last  = (start+(count-1)*step)*scale+offset
+        if step > 0:
+            return slice(first,last+1,step*scale)
+        return slice(first,last-1 if last > 0 else None,step*scale)
+    
+    def _empty(self,size):
+        """
+        Returns: A new, empty pixel list with the same storage as this one
+        
+        This is used by slicing to decide what type of pixel list to return.
+        
+        Parameter size: the number of pixels to store
+        Precondition: size is an int >= 0
+        """
+        return Pixels(size)
+    
     # PROGRESS MONITOR
     def progress(self):
         """
         Returns: the progress percentage of this image
         
         This value returned is in the range [0,1]. It is the percentage of pixels that
-        have been modified since unmark() was last called.
+        have been modified since unmark() was last called.  It is always 0 if tracking 
+        is turned off.
         """
         return self._change/self._size
     
+    def _mark(self,start,stop):
+        """
+        Marks the pixels in the range [start,stop) as changed.
+        
+        Parameter start: The first pixel position
+        Precondition: start is an int, 0 <= start <= stop
+        
+        Parameter stop: The position after the last pixel
+        Precondition: stop is an int, start <= stop <= len(self)
+        """
+        marker = self._marker
+        if marker is None:
+            return
+        self._touch(start,stop)
+        if self._change == self._size:
+            return
+        prev = marker.count(1,start,stop)
+        if prev < stop-start:
+            marker[start:stop] = b'\x01'*(stop-start)
+            self._change += (stop-start)-prev
+    
+    def _markstride(self,start,step,count):
+        """
+        Marks the pixels start, start+step, ... (count in all) as changed.
+        
+        Parameter start: The first pixel position
+        Precondition: start is an int, 0 <= start < len(self)
+        
+        Parameter step: The distance between pixels
+        Precondition: step is a nonzero int
+        
+        Parameter count: The number of pixels
+        Precondition: count is an int > 0 and all of the positions are valid
+        """
+        marker = self._marker
+        if marker is None:
+            return
+        last = start+(count-1)*step
+        self._touch(min(start,last),max(start,last)+1)
+        if self._change == self._size:
+            return
+        span = self._stride(start,step,count)
+        prev = marker[span].count(1)
+        if prev < count:
+            marker[span] = b'\x01'*count
+            self._change += count-prev
+    
+    def _touch(self,start,stop):
+        """
+        Adds the span [start,stop) to the dirty spans.
+        
+        The span is merged with the most recent one if they overlap or touch, which is
+        the common case for an operation that works through the image in order.  If 
+        there get to be too many spans, they are merged together (which may include 
+        some unchanged pixels, but never loses a changed one).
+        
+        Parameter start: The first pixel position
+        Precondition: start is an int, -len(self) <= start <= stop
+        
+        Parameter stop: The position after the last pixel
+        Precondition: stop is an int, start <= stop <= len(self)
+        """
+        if start < 0:
+            start += self._size
+            stop  += self._size
+        span = self._span
+        if span[0] <= start <= span[1]:
+            if stop > span[1]:
+                span[1] = stop
+            return
+        with self._lock:
+            dirty = self._dirty
+            if len(dirty) >= self.MAX_DIRTY:
+                dirty = _merge(dirty)
+                if len(dirty) >= self.MAX_DIRTY:
+                    dirty = [[dirty[0][0],dirty[-1][1]]]
+                self._dirty = dirty
+            span = [start,stop]
+            dirty.append(span)
+            self._span = span
+    
+    def popdirty(self):
+        """
+        Returns: The modified spans of this list since the last call, as (start,stop) pairs
+        
+        The spans are sorted, do not overlap, and together include every pixel modified
+        since the last time this method was called (or since the list was created).  
+        They may include some unmodified pixels as well.  Changes made directly to the 
+        buffer (or a NumPy view) are not included.
+        
+        If tracking is turned off, this returns None, as the changes are unknown.
+        
+        This method may be called by one thread while another is modifying the list.
+        """
+        if self._dirty is None:
+            return None
+        with self._lock:
+            # The most recent span may still be growing in another thread, so it stays 
+            # in place, shrunk to start where the spans returned leave off.
+            live  = self._span
+            spans = []
+            for span in self._dirty:
+                if span is live:
+                    span = [live[0],live[1]]
+                    live[0] = span[1]
+                if span[0] < span[1]:
+                    spans.append(span)
+            self._dirty = [] if live is _NO_SPAN else [live]
+        return [tuple(span) for span in _merge(spans)]
+    
     def unmark(self):
         """
         Resets the progress monitor to 0.
         
-        This clears all change tracking.
+        This clears all change tracking.  If tracking is turned off, it stays off.
         """
-        self._marker = [0]*self._size
+        if self._marker is not None:
+            self._marker = bytearray(self._size)
+            self._untracked = True
         self._change = 0
+    
+    # STORAGE
+    def changes(self):
+        """
+        Returns: The spans modified since this list was copied, as (start,stop) pairs
+        
+        The spans are sorted, do not overlap, and together include every pixel modified
+        since this list was made by copy() (or by the initializer).  They come from the
+        change markers of the progress monitor.  If the markers may have missed some of
+        those changes (because tracking is off, unmark() was called, or the buffer was
+        handed out for writing), this returns None instead.
+        """
+        if self._marker is None or self._untracked:
+            return None
+        if self._change == self._size:
+            return [(0,self._size)] if self._size else []
+        marker = self._marker
+        result = []
+        start  = marker.find(1) if self._change else -1
+        while start != -1:
+            stop = marker.find(0,start)
+            if stop == -1:
+                stop = self._size
+            result.append((start,stop))
+            start = marker.find(1,stop)
+        return result
+    
+    def makedelta(self,base,spans=None):
+        """
+        Returns: True if this list is now stored as a delta from base, False otherwise
+        
+        A delta only keeps the pixels where this list differs from base, and releases
+        the rest of the byte buffer.  The buffer is rebuilt the next time it is needed,
+        so the list still works as before (but the first access takes longer).  The
+        delta keeps the current contents of base, not base itself.  So base may be
+        modified, stored as a delta or spilled afterwards.  A delta does not track
+        changes.
+        
+        If this list is a copy of base, spans should be the result of changes().  If
+        spans is None, the differences are found by comparing the two buffers.
+        
+        This only works for plain Pixels objects of the same size.  It does nothing
+        (and returns False) for other pixel lists, or if more than half of the pixels
+        differ, as the delta would save little memory.
+        
+        Parameter base: The pixel list to store the differences from
+        Precondition: base is a pixel list
+        
+        Parameter spans: The spans where this list differs from base
+        Precondition: spans is None or a sorted list of disjoint (start,stop) pairs
+        """
+        assert isinstance(base,Pixels), repr(base)+' is not a pixel list'
+        if type(self) != Pixels or type(base) != Pixels or self._size != base._size:
+            return False
+        record = base.__dict__.get('_record')
+        source = base._buffer if record is None else record
+        if spans is None:
+            contents = source if record is None else record.rebuild()
+            spans = _difference(self._buffer,contents,self._size,self.DIFF_CHUNK)
+        if 2*sum(stop-start for (start,stop) in spans) > self._size:
+            return False
+        
+        view = memoryview(self._buffer)
+        data = b''.join([view[3*start:3*stop] for (start,stop) in spans])
+        if record is None:
+            # Counts as a copy of the buffer of base, so that base cannot modify it
+            self._store(_Delta(source,spans,data,base._owners))
+        else:
+            self._store(_Delta(source,spans,data))
+        return True
+    
+    def isdelta(self):
+        """
+        Returns: True if this list is stored as a delta (see makedelta), False otherwise
+        """
+        return isinstance(self.__dict__.get('_record'),_Delta)
+    
+    def spill(self,lock=None):
+        """
+        Returns: The number of bytes written to disk to spill this list
+        
+        Spilling moves the contents of this list to a compressed temporary file, and
+        releases the byte buffer (or delta).  The contents are read back the next time
+        the buffer is needed, so the list still works as before (but the first access
+        takes longer).  The file is deleted once it is no longer needed.  Like a delta,
+        a spilled list does not track changes.
+        
+        Like packing, spilling can run in a background thread while another thread uses
+        this list, and it is abandoned if the list changes in the meantime (see pack).
+        
+        This only works for plain Pixels objects.  It does nothing (and returns 0) for
+        other pixel lists, or if the spilling is abandoned.  If the list is already 
+        spilled, it just returns the size of the file.
+        
+        Parameter lock: The lock to hold while replacing the contents
+        Precondition: lock is None or a lock (like threading.Lock)
+        """
+        if type(self) != Pixels:
+            return 0
+        record = self.__dict__.get('_record')
+        if not isinstance(record,_Spill):
+            record = self._compress(_Spill,lock)
+            if record is not None:
+                self._dropcache()
+        return 0 if record is None else record.size
+    
+    def isspilled(self):
+        """
+        Returns: True if this list is spilled to disk (see spill), False otherwise
+        """
+        return isinstance(self.__dict__.get('_record'),_Spill)
+    
+    def dedupe(self,store,width):
+        """
+        Returns: True if this list is now stored as tiles in store, False otherwise
+        
+        Deduplicating splits the image into square tiles (of store.getTile() pixels on
+        a side), and keeps them in a content-addressed store.  A tile that is already in
+        the store is shared instead of stored again.  So pixel lists that are mostly the
+        same (like the edits of an image) share most of their memory.  The buffer is 
+        rebuilt from the tiles the next time it is needed, so the list still works as
+        before (but the first access takes longer).  Like a delta, a deduplicated list
+        does not track changes.
+        
+        This only works for plain Pixels objects.  It does nothing (and returns False)
+        for other pixel lists.
+        
+        Parameter store: The store for the tiles
+        Precondition: store is a TileStore
+        
+        Parameter width: The number of pixels in each row of the buffer
+        Precondition: width is an int > 0 that evenly divides len(self)
+        """
+        assert isinstance(store,TileStore), repr(store)+' is not a tile store'
+        assert type(width) == int and width > 0, repr(width)+' is not a valid width'
+        assert self._size % width == 0, repr(width)+' does not divide '+repr(self._size)
+        if type(self) != Pixels:
+            return False
+        self._store(_Tiles(store,width,self._buffer,self._size))
+        return True
+    
+    def isdeduped(self):
+        """
+        Returns: True if this list is stored as tiles (see dedupe), False otherwise
+        """
+        return isinstance(self.__dict__.get('_record'),_Tiles)
+    
+    def pack(self,lock=None):
+        """
+        Returns: True if this list is now packed (compressed in memory), False otherwise
+        
+        Packing replaces the byte buffer with a zlib-compressed copy.  The buffer is
+        decompressed the next time it is needed, so the list still works as before (but
+        the first access takes longer).  Like a delta, a packed list does not track 
+        changes.  This works well for images with flat regions (like pixellated images).
+        
+        Packing can run in a background thread while another thread uses this list.
+        While the buffer is compressed, this list counts as one more copy of it.  So
+        if the list is modified in the meantime, it makes a private copy of the buffer
+        first, and the packing is abandoned.  The list is only counted as a copy, and
+        the compressed contents only replace the buffer, while holding lock (if it is 
+        given).  A thread that holds the same lock while it calls unpack() (or turns on
+        tracking) can then safely modify the list afterwards.  When a lock is given, a
+        list that tracks changes is taken to be in use, so it is not packed.
+        
+        This only works for plain Pixels objects with a byte buffer.  It does nothing
+        (and returns False) for other pixel lists, or for a list that is already stored
+        in some other way (as a delta, spilled or packed).  It also does nothing if 
+        packing would not save memory: if the buffer is shared with a copy (or a delta
+        applies to it), or if it does not compress (like random noise).
+        
+        Parameter lock: The lock to hold while replacing the buffer
+        Precondition: lock is None or a lock (like threading.Lock)
+        """
+        if type(self) != Pixels or '_record' in self.__dict__:
+            return False
+        return self._compress(_Packed,lock,True) is not None
+    
+    def ispacked(self):
+        """
+        Returns: True if this list is packed in memory (see pack), False otherwise
+        """
+        return isinstance(self.__dict__.get('_record'),_Packed)
+    
+    def unpack(self):
+        """
+        Gets this pixel list ready to be modified.
+        
+        If the list is stored as a delta, spilled or packed, this rebuilds its buffer 
+        now (instead of the next time it is used).  If the buffer is shared with a copy
+        (or is being packed in another thread), this gives the list a private copy.  
+        Cached values are kept (see setcached), as the contents are still the same.
+        """
+        if '_record' in self.__dict__:
+            self._buffer = self.__dict__.pop('_record').rebuild()
+        self._detach()
+    
+    def footprint(self,seen=None):
+        """
+        Returns: The bytes used by the contents of this list, as a pair (memory,disk)
+        
+        The memory is the size of the byte buffer, of a delta (with the contents that it
+        applies to), of the compressed data of a packed list, or of the tiles of a 
+        deduplicated list, plus any cached values (see setcached) and the change markers
+        (one byte per pixel, while tracking).  The disk is the size of the file of a 
+        spilled list.
+        
+        Pixel lists often share contents: copies share their buffer, deltas share their
+        base, and deduplicated lists share tiles.  To count shared contents only once,
+        pass the same set seen for each list.  It holds the ids of the contents counted
+        so far.
+        
+        Parameter seen: The ids of the contents already counted
+        Precondition: seen is None or a set of ints
+        """
+        seen = set() if seen is None else seen
+        (memory,disk) = _footprint(self.__dict__.get('_record',self.__dict__.get('_buffer')),seen)
+        owners = self.__dict__.get('_owners',())
+        if len(owners) > 1:
+            memory += _cachebytes(owners[1],seen)
+        marker = self.__dict__.get('_marker')
+        if marker is not None:
+            memory += len(marker)
+        return (memory,disk)
+    
+    def exclusive(self):
+        """
+        Returns: The bytes of memory that only this list uses (which spilling it frees)
+        
+        This is the memory of footprint(), less anything that other pixel lists still
+        use: contents shared with a copy, contents that a delta applies to (see 
+        makedelta), and tiles that other lists use (see dedupe).  Spilling a list that
+        shares its contents frees nothing.  A spilled list uses no memory (but the
+        change markers still count), and cached values are not included.
+        """
+        if self._owners[0] > 1:
+            return 0
+        marker = self.__dict__.get('_marker')
+        memory = 0 if marker is None else len(marker)
+        record = self.__dict__.get('_record')
+        if record is None:
+            return memory+memoryview(self._buffer).nbytes
+        if record.pins:
+            return memory
+        if isinstance(record,_Tiles):
+            return memory+record.store.exclusive(record.keys)
+        if isinstance(record,(_Delta,_Packed)):
+            return memory+len(record.data)
+        return memory
+    
+    def _compress(self,kind,lock,smaller=False):
+        """
+        Returns: The new record if the contents are now stored compressed, None otherwise
+        
+        The contents (a byte buffer or another record) are compressed without holding 
+        lock.  The lock is only held (if it is given) to start, and to replace the 
+        contents with the new record.  This is abandoned if the contents change or 
+        tracking is restarted in the meantime.  When a lock is given, a list that tracks
+        changes is in use by another thread (like the current edit of a history), so 
+        it is left alone.  A byte buffer counts as one more copy of itself while it is
+        compressed, so that a modification makes a private copy instead (see pack).  The
+        data of a packed list is already compressed, so it is used as it is.
+        
+        Parameter kind: The type of the new record
+        Precondition: kind is _Packed or _Spill
+        
+        Parameter lock: The lock to hold while replacing the contents
+        Precondition: lock is None or a lock (like threading.Lock)
+        
+        Parameter smaller: Whether to give up unless this frees memory (that is, unless
+        the buffer is not shared and the new record is smaller than it)
+        Precondition: smaller is a bool
+        """
+        with nullcontext() if lock is None else lock:
+            source = self.__dict__.get('_record')
+            marker = self.__dict__.get('_marker')
+            if lock is not None and marker is not None:
+                return None
+            owners = None
+            if source is None:
+                source = self._buffer
+                owners = self._owners
+                with _COUNT_LOCK:
+                    if smaller and owners[0] > 1:
+                        return None
+                    owners[0] += 1
+        try:
+            if isinstance(source,_Packed):
+                data = source.data
+            elif isinstance(source,_Record):
+                data = zlib.compress(source.rebuild(),self.ZLIB_LEVEL)
+            else:
+                data = zlib.compress(source,self.ZLIB_LEVEL)
+                if smaller and len(data) >= memoryview(source).nbytes:
+                    return None
+            with nullcontext() if lock is None else lock:
+                current = self.__dict__.get('_record',self.__dict__.get('_buffer'))
+                if current is not source or self.__dict__.get('_marker') is not marker:
+                    return None
+                record = kind(data)
+                self._store(record)
+                return record
+        finally:
+            if owners is not None:
+                with _COUNT_LOCK:
+                    owners[0] -= 1
+    
+    def _store(self,record):
+        """
+        Replaces the byte buffer with a record of its contents.
+        
+        The buffer is rebuilt from record the next time it is needed.  This list stops
+        sharing its buffer with any copies, and stops tracking changes.  It still shares
+        the cache with them (see setcached), so values cached later by a copy that is 
+        not modified are cached for this list too.
+        
+        Parameter record: The record of the contents
+        Precondition: record is a _Record with the contents of this list
+        """
+        self.tracking = False
+        with _COUNT_LOCK:
+            owners = self._owners
+            owners[0] -= 1
+            if self._exported:
+                self._owners = [1]
+            else:
+                if len(owners) == 1:
+                    owners.append({})
+                self._owners = [1,owners[1]]
+        self._record = record
+        self.__dict__.pop('_buffer',None)
+    
+    def __getattr__(self,name):
+        """
+        Returns: The byte buffer rebuilt from its record (the only attribute computed on
+        demand)
+        
+        Parameter name: The attribute name
+        Precondition: name is a string
+        """
+        if name == '_buffer' and '_record' in self.__dict__:
+            self._buffer = self.__dict__.pop('_record').rebuild()
+            return self._buffer
+        raise AttributeError(repr(type(self).__name__)+' object has no attribute '+repr(name))
+
+
+# A dirty span that never matches a position, so the next change starts a new one
+_NO_SPAN = (float('inf'),float('inf'))
+
+# The lock for changing copy counts and pins, which a background thread may change too
+# (reentrant, as a pixel list may be deleted while the lock is held)
+_COUNT_LOCK = threading.RLock()
+
+
+def _span_error(start,count,step):
+    """
+    Returns: The error message for a span that does not fit in a pixel list
+    
+    Parameter start: The first pixel position
+    Precondition: NONE
+    
+    Parameter count: The number of pixels
+    Precondition: NONE
+    
+    Parameter step: The distance between pixels
+    Precondition: NONE
+    """
+    return ('span of '+repr(count)+' pixels at '+repr(start)+' with step '+repr(step)+
+            ' is not in the pixel list')
+
+
+class _Record(object):
+    """
+    The contents of a pixel list, stored in some other way than a byte buffer
+    
+    A pixel list with a record has no byte buffer.  The next time the buffer is 
+    needed, it calls the method rebuild() of the record, which every subclass defines.
+    It takes no arguments and returns the contents as a new byte array.  Records are
+    never modified, so they can be shared.
+    
+    ATTRIBUTES:
+        pins: The number of deltas that apply to this record [int >= 0]
+    """
+    
+    pins = 0
+
+
+class _Delta(_Record):
+    """
+    The contents of a pixel list stored as a delta (see Pixels.makedelta)
+    
+    ATTRIBUTES:
+        base:   The contents the delta applies to [byte buffer or _Record]
+        spans:  The pixel spans that differ from base [list of (start,stop) pairs]
+        data:   The packed RGB bytes of those spans [bytes]
+        owners: The copy count that base is pinned in, or None [list or None]
+    A byte buffer in base is counted as one more copy of it (in owners), so that the
+    pixel list it belongs to makes a private copy before modifying it.  A record in 
+    base is pinned in its pins attribute instead.
+    """
+    
+    def __init__(self,base,spans,data,owners=None):
+        """
+        Initializer: Creates a delta from base
+        
+        Parameter base: The contents the delta applies to
+        Precondition: base is a bytes-like object or a _Record
+        
+        Parameter spans: The pixel spans that differ from base
+        Precondition: spans is a sorted list of disjoint (start,stop) pairs
+        
+        Parameter data: The packed RGB bytes of those spans
+        Precondition: data is a bytes object
+        
+        Parameter owners: The copy count of the buffer base
+        Precondition: owners is None or the _owners list of a pixel list with buffer base
+        """
+        self.base   = base
+        self.spans  = spans
+        self.data   = data
+        self.owners = owners
+        with _COUNT_LOCK:
+            if owners is not None:
+                owners[0] += 1
+            elif isinstance(base,_Record):
+                base.pins += 1
+    
+    def __del__(self):
+        """
+        Releases the pin on base
+        """
+        owners = self.__dict__.get('owners')
+        with _COUNT_LOCK:
+            if owners is not None:
+                owners[0] -= 1
+            elif isinstance(self.__dict__.get('base'),_Record):
+                self.base.pins -= 1
+    
+    def rebuild(self):
+        """
+        Returns: The contents of the delta as a new byte array
+        """
+        if isinstance(self.base,_Record):
+            buffer = self.base.rebuild()
+        else:
+            buffer = array('B')
+            buffer.frombytes(memoryview(self.base))
+        view = memoryview(buffer)
+        data = memoryview(self.data)
+        pos = 0
+        for (start,stop) in self.spans:
+            size = 3*(stop-start)
+            view[3*start:3*stop] = data[pos:pos+size]
+            pos += size
+        view.release()
+        return buffer
+
+
+class _Packed(_Record):
+    """
+    The contents of a pixel list compressed in memory (see Pixels.pack)
+    
+    ATTRIBUTES:
+        data: The zlib-compressed contents [bytes]
+    """
+    
+    def __init__(self,data):
+        """
+        Initializer: Creates a record for compressed contents
+        
+        Parameter data: The zlib-compressed contents
+        Precondition: data is a bytes object
+        """
+        self.data = data
+    
+    def rebuild(self):
+        """
+        Returns: The decompressed contents, as a new byte array
+        """
+        buffer = array('B')
+        buffer.frombytes(zlib.decompress(self.data))
+        return buffer
+
+
+class _Spill(_Record):
+    """
+    The contents of a pixel list moved to a compressed temporary file (see Pixels.spill)
+    
+    ATTRIBUTES:
+        file: The temporary file, which is deleted when closed [binary file]
+        size: The number of bytes in the file                  [int >= 0]
+    """
+    
+    def __init__(self,data):
+        """
+        Initializer: Writes compressed contents to a new temporary file
+        
+        Parameter data: The zlib-compressed contents
+        Precondition: data is a bytes object
+        """
+        self.file = tempfile.TemporaryFile()
+        self.file.write(data)
+        self.size = len(data)
+    
+    def __del__(self):
+        """
+        Deletes the temporary file
+        """
+        if 'file' in self.__dict__:
+            self.file.close()
+    
+    def rebuild(self):
+        """
+        Returns: The contents read back from the file, as a new byte array
+        """
+        self.file.seek(0)
+        buffer = array('B')
+        buffer.frombytes(zlib.decompress(self.file.read()))
+        return buffer
+
+
+class _Tiles(_Record):
+    """
+    The contents of a pixel list stored as tiles in a TileStore (see Pixels.dedupe)
+    
+    ATTRIBUTES:
+        store: The store that holds the tiles          [TileStore]
+        width: The number of pixels in a buffer row    [int > 0]
+        size:  The number of pixels                    [int >= 0]
+        keys:  The keys of the tiles, in row-major order [list of bytes]
+    """
+    
+    def __init__(self,store,width,contents,size):
+        """
+        Initializer: Adds the tiles of contents to store
+        
+        Parameter store: The store for the tiles
+        Precondition: store is a TileStore
+        
+        Parameter width: The number of pixels in a buffer row
+        Precondition: width is an int > 0 that evenly divides size
+        
+        Parameter contents: The contents to split into tiles
+        Precondition: contents is a bytes-like object with 3*size bytes
+        
+        Parameter size: The number of pixels
+        Precondition: size is an int >= 0
+        """
+        self.store = store
+        self.width = width
+        self.size  = size
+        self.keys  = []
+        view = memoryview(contents).cast('B')
+        for (rows,start,stop) in self._tiles():
+            tile = b''.join([view[3*(row*width+start):3*(row*width+stop)] for row in rows])
+            self.keys.append(store.add(tile))
+    
+    def __del__(self):
+        """
+        Releases the tiles in the store
+        """
+        for key in self.__dict__.get('keys',()):
+            self.store.release(key)
+    
+    def rebuild(self):
+        """
+        Returns: The contents assembled from the tiles, as a new byte array
+        """
+        buffer = array('B',bytes(3*self.size))
+        view = memoryview(buffer)
+        width = self.width
+        for ((rows,start,stop),key) in zip(self._tiles(),self.keys):
+            tile = memoryview(self.store.get(key))
+            line = 3*(stop-start)
+            for (pos,row) in enumerate(rows):
+                view[3*(row*width+start):3*(row*width+stop)] = tile[pos*line:(pos+1)*line]
+        view.release()
+        return buffer
+    
+    def _tiles(self):
+        """
+        Returns: The tiles of the contents, as a list of (rows,start,stop) triples
+        
+        Each tile covers the columns start..stop-1 of the buffer rows in rows (a range).
+        Tiles on the right and bottom edges may be smaller than the others.
+        """
+        side = self.store.getTile()
+        height = self.size//self.width
+        result = []
+        for top in range(0,height,side):
+            rows = range(top,min(height,top+side))
+            for left in range(0,self.width,side):
+                result.append((rows,left,min(self.width,left+side)))
+        return result
+
+
+class TileStore(object):
+    """
+    A content-addressed store of pixel tiles (see Pixels.dedupe)
+    
+    Each tile is kept under a hash of its bytes, so a tile that appears in several pixel
+    lists (like the unchanged parts of the edits of an image) is only stored once.  The
+    store counts the uses of each tile, and forgets a tile once nothing uses it.  The
+    store may be used by several threads at once.
+    
+    IMMUTABLE ATTRIBUTES (Fixed after initialization)
+        _side:  The width (and height) of a tile in pixels [int > 0]
+        _tiles: The tile bytes and use counts by key [dict of bytes to list]
+        _lock:  The lock for changing the tiles [Lock]
+    """
+    
+    # The default width (and height) of a tile in pixels
+    TILE = 64
+    
+    def __init__(self,tile=None):
+        """
+        Initializer: Creates an empty tile store
+        
+        The tile size cannot change once the store is made, as the lists stored in it
+        depend on it.
+        
+        Parameter tile: The width (and height) of a tile in pixels (or None for TILE)
+        Precondition: tile is None or an int > 0
+        """
+        if tile is None:
+            tile = self.TILE
+        assert type(tile) == int and tile > 0, repr(tile)+' is not a valid tile size'
+        self._side  = tile
+        self._tiles = {}
+        self._lock  = threading.Lock()
+    
+    def getTile(self):
+        """
+        Returns: The width (and height) of a tile in pixels
+        """
+        return self._side
+    
+    def __len__(self):
+        """
+        Returns: The number of distinct tiles in the store
+        """
+        return len(self._tiles)
+    
+    def nbytes(self):
+        """
+        Returns: The number of bytes in all of the tiles of the store
+        """
+        with self._lock:
+            return sum(len(entry[0]) for entry in self._tiles.values())
+    
+    def exclusive(self,keys):
+        """
+        Returns: The number of bytes in the tiles that are only used by keys
+        
+        These are the tiles that releasing every key in keys would forget.  A key may 
+        appear more than once (for a tile used more than once by the same list).
+        
+        Parameter keys: The tile keys
+        Precondition: keys is a list of keys of tiles in the store
+        """
+        uses = {}
+        for key in keys:
+            uses[key] = uses.get(key,0)+1
+        with self._lock:
+            return sum(len(self._tiles[key][0]) for (key,count) in uses.items() 
+                       if self._tiles[key][1] == count)
+    
+    def add(self,data):
+        """
+        Returns: The key of the tile data, after adding one use of it to the store
+        
+        Parameter data: The bytes of the tile
+        Precondition: data is a bytes object
+        """
+        key = hashlib.blake2b(data,digest_size=16).digest()
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is None:
+                self._tiles[key] = [data,1]
+            else:
+                entry[1] += 1
+        return key
+    
+    def get(self,key):
+        """
+        Returns: The bytes of the tile with the given key
+        
+        Parameter key: The tile key
+        Precondition: key is the key of a tile in the store
+        """
+        with self._lock:
+            return self._tiles[key][0]
+    
+    def release(self,key):
+        """
+        Removes one use of the tile with the given key (forgetting it after the last)
+        
+        Parameter key: The tile key
+        Precondition: key is the key of a tile in the store
+        """
+        with self._lock:
+            entry = self._tiles[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._tiles[key]
+
+
+def _footprint(contents,seen):
+    """
+    Returns: The bytes used by contents not in seen, as a pair (memory,disk)
+    
+    The ids of everything counted are added to seen.
+    
+    Parameter contents: The contents of a pixel list
+    Precondition: contents is a byte buffer or a _Record
+    
+    Parameter seen: The ids of the contents already counted
+    Precondition: seen is a set of ints
+    """
+    if id(contents) in seen:
+        return (0,0)
+    seen.add(id(contents))
+    if isinstance(contents,_Spill):
+        return (0,contents.size)
+    if isinstance(contents,_Packed):
+        return (len(contents.data),0)
+    if isinstance(contents,_Tiles):
+        memory = 0
+        for key in contents.keys:
+            tile = contents.store.get(key)
+            if id(tile) not in seen:
+                seen.add(id(tile))
+                memory += len(tile)
+        return (memory,0)
+    if isinstance(contents,_Delta):
+        (memory,disk) = _footprint(contents.base,seen)
+        return (memory+len(contents.data),disk)
+    return (memoryview(contents).nbytes,0)
+
+
+def _cachebytes(value,seen):
+    """
+    Returns: The bytes of the buffers in a cached value not in seen
+    
+    The value may be a buffer (like an array), or a dict, list or tuple of them.  Other
+    values are not counted.  The ids of everything counted are added to seen.
+    
+    Parameter value: The cached value
+    Precondition: NONE
+    
+    Parameter seen: The ids of the contents already counted
+    Precondition: seen is a set of ints
+    """
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value,dict):
+        value = list(value.values())
+    if isinstance(value,(list,tuple)):
+        return sum(_cachebytes(item,seen) for item in value)
+    try:
+        return memoryview(value).nbytes
+    except TypeError:
+        return 0
+
+
+def _difference(first,second,size,chunk):
+    """
+    Returns: The spans of pixels where two buffers differ, as (start,stop) pairs
+    
+    The buffers are compared a chunk at a time, so the spans are whole chunks (except
+    at the end) and may include some pixels that are the same.
+    
+    Parameter first: The first buffer
+    Precondition: first is a bytes-like object with 3*size bytes
+    
+    Parameter second: The second buffer
+    Precondition: second is a bytes-like object with 3*size bytes
+    
+    Parameter size: The number of pixels
+    Precondition: size is an int >= 0
+    
+    Parameter chunk: The number of pixels to compare at a time
+    Precondition: chunk is an int > 0
+    """
+    first  = memoryview(first).cast('B')
+    second = memoryview(second).cast('B')
+    spans = []
+    for start in range(0,size,chunk):
+        stop = min(size,start+chunk)
+        if first[3*start:3*stop] != second[3*start:3*stop]:
+            if spans and spans[-1][1] == start:
+                spans[-1] = (spans[-1][0],stop)
+            else:
+                spans.append((start,stop))
+    return spans
+
+
+def _merge(spans):
+    """
+    Returns: The given spans, sorted, with overlapping and touching spans merged
+    
+    Parameter spans: The spans to merge
+    Precondition: spans is a list of [start,stop] lists
+    """
+    result = []
+    for (start,stop) in sorted(spans):
+        if result and start <= result[-1][1]:
+            if stop > result[-1][1]:
+                result[-1][1] = stop
+        else:
+            result.append([start,stop])
+    return result
+
+
+class NumpyPixels(Pixels):
+    """
+    A pixel list backed by a NumPy array
+    
+    This class behaves exactly like Pixels, but the pixel data lives in a flat NumPy 
+    array of type uint8.  The method ndarray() returns a view of that data with one
+    row per pixel (or one row per image row if you give it a width).  The view shares
+    memory with the pixel list, so vectorized NumPy code can read and modify the image
+    without any copying.
+    
+    The buffer property is a memoryview of the same array, so the GUI can still display
+    this pixel list directly.
+    
+    This class requires NumPy.  Creating one without NumPy raises an ImportError.
+    """
+    
+    # INITIALIZER
+    def __init__(self,size):
+        """
+        Initializer: Creates a new NumPy-backed pixel list
+        
+        The initializer creates an empty (black) pixel list.
+        
+        Parameter size: the number of pixels to store
+        Precondition: size is an int >= 0
+        """
+        if numpy is None:
+            raise ImportError('NumpyPixels requires NumPy')
+        assert type(size) == int, repr(size)+' is not an int'
+        assert size >= 0, repr(size)+' is negative'
+        
+        self._size   = size
+        self._array  = numpy.zeros(size*3,dtype=numpy.uint8)
+        self._buffer = memoryview(self._array)
+        self._owners = [1]
+        self.tracking = self.TRACK_CHANGES
+    
+    def ndarray(self,width=None):
+        """
+        Returns: A NumPy view of this pixel list
+        
+        If width is None, the view has shape (len(self), 3).  Otherwise the view has 
+        shape (height, width, 3), where height is len(self)//width.  The view is not a 
+        copy; any changes to it change this pixel list (but are not tracked by the 
+        progress monitor).  Since the view can be written to, this pixel list stops 
+        sharing its buffer with any copies first, and later copies get their own buffer
+        right away.
+        
+        Parameter width: the image width
+        Precondition: width is None or an int > 0 that evenly divides len(self)
+        """
+        self._own()
+        self._untracked = True
+        self._exported  = True
+        if width is None:
+            return self._array.reshape(self._size,3)
+        assert type(width) == int and width > 0, repr(width)+' is not a valid width'
+        assert self._size % width == 0, repr(width)+' does not divide '+repr(self._size)
+        return self._array.reshape(self._size//width,width,3)
+    
+    def _empty(self,size):
+        """
+        Returns: A new, empty NumPy-backed pixel list
+        
+        Parameter size: the number of pixels to store
+        Precondition: size is an int >= 0
+        """
+        return NumpyPixels(size)
+    
+    def _setbuffer(self,view):
+        """
+        Makes view the byte buffer of this pixel list, as a NumPy array.
+        
+        Parameter view: The new byte buffer
+        Precondition: view is a 1-dimensional memoryview of bytes with 3*len(self) bytes
+        """
+        self._array  = numpy.frombuffer(view,dtype=numpy.uint8)
+        self._buffer = memoryview(self._array)
+    
+    def _copybuffer(self):
+        """
+        Replaces the NumPy array with a private copy of its contents.
+        """
+        self._array  = self._array.copy()
+        self._buffer = memoryview(self._array)
+
+
+class MappedPixels(Pixels):
+    """
+    A pixel list stored in a raw RGB file on disk
+    
+    This class behaves exactly like Pixels, but the byte buffer is a memory map of a 
+    file containing packed RGB data (3 bytes per pixel, with no header).  Nothing is 
+    read when the file is opened; the operating system loads (and unloads) parts of the
+    file as they are used.  That means you can work with images that do not fit in 
+    memory, and opening even a huge file is instant.
+    
+    By default, changes to this pixel list are written back to the file.  If writeback 
+    is False, the file is never changed; modified pages are kept in memory instead.
+    
+    Copies made with copy() share the mapping until they are modified.  A modified copy
+    moves its data to an anonymous scratch file, so it does not fill up memory either.
+    Call close() when you are done with the pixel list (and all of its copies).  If 
+    writeback is False, the copies are plain Pixels objects instead (see copy).
+    """
+    
+    # INITIALIZER
+    def __init__(self,filename,size=None,offset=0,writeback=True):
+        """
+        Initializer: Creates a pixel list backed by the given file
+        
+        Parameter filename: The raw RGB file
+        Precondition: filename is a string naming an existing file
+        
+        Parameter size: The number of pixels to use (or None for the whole file)
+        Precondition: size is None or an int >= 0 that fits in the file after offset
+        
+        Parameter offset: The number of bytes to skip at the start of the file
+        Precondition: offset is an int >= 0
+        
+        Parameter writeback: Whether changes are written to the file
+        Precondition: writeback is a bool
+        """
+        assert type(offset) == int and offset >= 0, repr(offset)+' is not a valid offset'
+        assert type(writeback) == bool, repr(writeback)+' is not a bool'
+        length = os.path.getsize(filename)-offset
+        if size is None:
+            size = length//3
+        assert type(size) == int and size >= 0, repr(size)+' is not a valid size'
+        if size*3 > length:
+            raise ValueError(filename+' is too small for '+str(size)+' pixels')
+        
+        self._size = size
+        self._writeback = writeback
+        if size == 0:
+            self._map = None
+            self._buffer = memoryview(bytearray())
+        else:
+            access = mmap.ACCESS_WRITE if writeback else mmap.ACCESS_COPY
+            with open(filename,'r+b' if writeback else 'rb') as file:
+                self._map = mmap.mmap(file.fileno(),0,access=access)
+            self._buffer = memoryview(self._map)[offset:offset+size*3]
+        self._owners = [1]
+        self.tracking = self.TRACK_CHANGES
+    
+    @classmethod
+    def create(cls,filename,size):
+        """
+        Returns: A new (black) pixel list backed by the given file
+        
+        The file is created, or truncated if it already exists.  It will contain size 
+        pixels of raw RGB data.
+        
+        Parameter filename: The raw RGB file
+        Precondition: filename is a string naming a file that can be written
+        
+        Parameter size: The number of pixels to store
+        Precondition: size is an int >= 0
+        """
+        assert type(size) == int and size >= 0, repr(size)+' is not a valid size'
+        with open(filename,'w+b') as file:
+            file.truncate(size*3)
+        return cls(filename,size)
+    
+    @classmethod
+    def frombuffer(cls,data):
+        """
+        Raises a TypeError, as a mapped pixel list must be backed by a file
+        
+        Parameter data: The pixel data
+        Precondition: NONE
+        """
+        raise TypeError(cls.__name__+' cannot use an outside buffer')
+    
+    # COPYING
+    def copy(self):
+        """
+        Returns: A copy of this pixel list.
+        
+        If changes are written back to the file, the copy is another MappedPixels object
+        (see the class description).  Otherwise the copy is a plain Pixels object, which
+        shares the mapping until it is modified, and then makes a private copy in memory
+        like any other.  So the edits of a read-only image file (like those in an edit 
+        history) can be stored as deltas, packed or spilled, which only works for plain
+        pixel lists.
+        """
+        result = super().copy()
+        if not self._writeback:
+            result.__class__ = Pixels
+            del result._map
+            del result._writeback
+        return result
+    
+    # FILE METHODS
+    def flush(self):
+        """
+        Writes any changes to this pixel list back to the file.
+        
+        The operating system will eventually do this on its own.  This method forces it
+        to happen now.
+        """
+        if self._map is not None and self._owners[0] == 1:
+            self._map.flush()
+    
+    def close(self):
+        """
+        Flushes any changes and unmaps the file.
+        
+        This pixel list cannot be used after it is closed.  If the mapping is still
+        shared with an unmodified copy, the copy keeps it open instead (and the last 
+        one to close it unmaps it).
+        """
+        self._dropcache()
+        self.flush()
+        if self._map is not None and self._owners[0] == 1:
+            self._buffer.release()
+            self._map.close()
+        elif self._map is not None:
+            self._release()
+        self._map = None
+    
+    def _copybuffer(self):
+        """
+        Replaces the mapping with a private one backed by a scratch file.
+        """
+        source = self._buffer
+        if len(source) == 0:
+            return
+        with tempfile.TemporaryFile() as file:
+            file.truncate(len(source))
+            self._map = mmap.mmap(file.fileno(),0)
+        self._map[:] = source
+        self._buffer = memoryview(self._map)
+
+
+class SharedPixels(Pixels):
+    """
+    A pixel list stored in shared memory
+    
+    This class behaves exactly like Pixels, but the byte buffer is a block of shared
+    memory with a name.  Another process can attach to the same block by creating a 
+    SharedPixels with that name, and then both processes see the same pixels without
+    copying (or pickling) anything.  This is what allows several worker processes to 
+    work on separate bands of the same image at once.
+    
+    Every process should call close() when it is done with the pixel list.  The process 
+    that created the block should also call unlink() to free it.
+    
+    Copies made with copy() share the block until they are modified.  A modified copy
+    moves to a new block, which changes its name.  The old block stays with the other
+    copies, and is still freed by unlink().  The new block is private to this process,
+    so close() frees it as well.
+    """
+    
+    @property
+    def name(self):
+        """
+        The name of the shared memory block
+        
+        Other processes use this name to attach to this pixel list.
+        """
+        return self._memory.name
+    
+    # INITIALIZER
+    def __init__(self,size,name=None):
+        """
+        Initializer: Creates a new pixel list in shared memory, or attaches to one.
+        
+        If name is None, this creates a new (black) shared memory block for size pixels.
+        Otherwise it attaches to the existing block with that name, which must have room
+        for size pixels.
+        
+        Parameter size: the number of pixels to store
+        Precondition: size is an int >= 0
+        
+        Parameter name: The name of an existing block to attach to (or None)
+        Precondition: name is None or a string
+        """
+        assert type(size) == int, repr(size)+' is not an int'
+        assert size >= 0, repr(size)+' is negative'
+        assert name is None or type(name) == str, repr(name)+' is not a string'
+        
+        self._origin  = None
+        self._private = False
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True,size=max(size*3,1))
+            self._origin = self._memory
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+            if self._memory.size < size*3:
+                self._memory.close()
+                raise ValueError('shared memory '+name+' is too small for '+str(size)+' pixels')
+        self._size   = size
+        self._buffer = self._memory.buf[:size*3]
+        self._owners = [1]
+        self.tracking = self.TRACK_CHANGES
+    
+    @classmethod
+    def frombuffer(cls,data):
+        """
+        Raises a TypeError, as a shared pixel list must be backed by shared memory
+        
+        Parameter data: The pixel data
+        Precondition: NONE
+        """
+        raise TypeError(cls.__name__+' cannot use an outside buffer')
+    
+    # SHARED MEMORY METHODS
+    def close(self):
+        """
+        Detaches this process from the shared memory block.
+        
+        This pixel list cannot be used after it is closed.  If the block is still shared
+        with an unmodified copy, the copy keeps it open instead.  If the block was made 
+        when this list (or a copy) was modified, it is freed once it is closed.  The last
+        copy to close the block detaches from it.
+        """
+        self._dropcache()
+        if self._owners[0] == 1:
+            self._buffer.release()
+            self._memory.close()
+            if self._private:
+                self._memory.unlink()
+        else:
+            self._release()
+    
+    def unlink(self):
+        """
+        Frees the shared memory block created by the initializer once every process has 
+        closed it.
+        
+        This should only be called by the process that created the block, and only 
+        once (by this list or one of its copies).  It does nothing for a list that 
+        attached to an existing block.
+        """
+        if self._origin is not None:
+            self._origin.unlink()
+    
+    def _copybuffer(self):
+        """
+        Replaces the shared memory block with a new (private) one holding the same pixels.
+        
+        The old block is left open for the copies that still share it.
+        """
+        source = self._buffer
+        self._memory = shared_memory.SharedMemory(create=True,size=max(len(source),1))
+        self._buffer = self._memory.buf[:len(source)]
+        self._buffer[:] = source
+        self._private = True
 
 
 class _PixelIterator(object):
@@ -0,0 +1,264 @@
+"""
+Operation-log edit histories and replayable recipes
+
+The class Editor keeps every edit in its history as an image (stored as a delta or
+compressed, see a6history).  The class LogEditor in this module is an alternate history
+mode.  It records the operations applied in each edit, like ('pixellate', 20) or
+('encode', 'hello'), and only keeps a snapshot of the image every KEYFRAME edits.  An
+undo rebuilds the previous edit by replaying its operations from the nearest snapshot.
+So the memory for the history hardly grows with the number of edits.
+
+A list of operations is a recipe.  The function apply replays a recipe on any image,
+so the edits made to one image can be repeated on a batch of others.  The functions
+save and load store a recipe in a text file, with one operation per line.
+"""
+import ast                          # Reading recipes safely
+import functools                    # Wrapping the Editor methods
+import inspect                      # Recording keyword arguments
+
+import a6editor
+
+
+# The Editor methods that change the current image (and so are recorded)
+OPERATIONS = ('invert','transpose','reflectHori','rotateRight','rotateLeft','reflectVert',
+              'monochromify','curve','jail','vignette','pixellate','encode')
+
+
+class LogEditor(a6editor.Editor):
+    """
+    An Editor that records its operations instead of storing every edit
+
+    Each edit in the history is the list of operations applied during that edit.  An
+    operation is a tuple of the name of an Editor method (from OPERATIONS) and its
+    arguments.  Only the changes made with those methods are recorded, and only if they
+    succeed (an encode that returns False is not recorded).  Changes made to the 
+    current image in any other way are lost if the edit has to be rebuilt.
+
+    At the end of every KEYFRAME-th edit, a copy of the image is kept as a snapshot.
+    Undo rebuilds the previous edit from the nearest snapshot before it (or from the
+    start of the history) by replaying the operations in between.
+
+    IMMUTABLE ATTRIBUTES (Fixed after initialization)
+        _original:  The original image [Image object]
+    MUTABLE ATTRIBUTES
+        _current:   The image being edited [Image object]
+        _start:     The image before the first edit [Image object]
+        _edits:     The operations of each edit [non-empty list of lists of tuples]
+        _snapshots: The image at the end of some edits [dict of edit number to Image]
+    The length of _edits is never longer than MAX_HISTORY.  The other attributes of
+    ImageHistory are set up by its initializer, but this class does not store any 
+    edits in _history.
+    """
+
+    # How often (in edits) a snapshot of the image is kept
+    KEYFRAME = 10
+
+    # GETTERS
+    def getCurrent(self):
+        """
+        Returns: The most recent edit
+        """
+        return self._current
+
+    def getLog(self):
+        """
+        Returns: The operations of every edit so far, in order
+
+        The result is a recipe, which can be saved or applied to other images.
+        """
+        return [operation for edit in self._edits for operation in edit]
+
+    def getStats(self):
+        """
+        Returns: A dictionary of statistics about the storage of the edit history
+
+        The dictionary has the same keys as for ImageHistory, plus 'operations' (the
+        number of operations recorded) and 'snapshots' (the number of snapshots).  The
+        pixel data counted is that of the start of the history, the current edit and 
+        the snapshots.  There are no tiles, as keyframes are not used.
+        """
+        stats = super().getStats()
+        stats['edits'] = len(self._edits)
+        stats['operations'] = len(self.getLog())
+        stats['snapshots'] = len(self._snapshots)
+        return stats
+
+    # INITIALIZER
+    def __init__(self,original):
+        """
+        Initializer: Creates an operation log for the given image.
+
+        The log starts with exactly one (empty) edit, whose image is a copy of the
+        original image.
+
+        Parameter original: The image to edit
+        Precondition: original is an Image object
+        """
+        super().__init__(original)
+        self._start=original.copy()
+        self._current=self._start.copy()
+        self._edits=[[]]
+        self._snapshots={}
+
+    # EDIT METHODS
+    def undo(self):
+        """
+        Returns: True if the latest edit can be undone, False otherwise.
+
+        This removes the latest edit, and rebuilds the one before it (which becomes
+        the current edit again).  The log can never be empty.  So if there is only one
+        edit, this does not remove anything and returns False instead.
+        """
+        if len(self._edits)==1:
+            return False
+        self._edits.pop()
+        number=len(self._edits)-1
+        self._current=self._rebuild(number)
+        # The current edit can change again, so its snapshot is no longer valid
+        self._snapshots={k:v for (k,v) in self._snapshots.items() if k<number}
+        return True
+
+    def clear(self):
+        """
+        Deletes the entire edit history, restoring the original image.
+        """
+        self._start=self.getOriginal().copy()
+        self._current=self._start.copy()
+        self._edits=[[]]
+        self._snapshots={}
+
+    def increment(self):
+        """
+        Starts a new edit, with a copy of the most recent edit.
+
+        If this is the KEYFRAME-th edit since the last snapshot, the image is kept as
+        a snapshot first.  If the log grows larger than MAX_HISTORY, the oldest edit is
+        folded into the start of the history.
+        """
+        number=len(self._edits)-1
+        if number-max(self._snapshots,default=-1) >= self.KEYFRAME:
+            self._snapshots[number]=self._current.copy()
+        if len(self._edits)>=self.MAX_HISTORY:
+            self._start=self._rebuild(0)
+            del self._edits[0]
+            self._snapshots={k-1:v for (k,v) in self._snapshots.items() if k>0}
+        self._edits.append([])
+        self._current=self._current.copy()
+
+    # HELPER METHODS
+    def _images(self):
+        """
+        Returns: The images whose pixels are kept by this log (counted by getStats)
+        """
+        return [self._start,self._current]+list(self._snapshots.values())
+    
+    def _rebuild(self,number):
+        """
+        Returns: A new image with the contents at the end of the given edit
+
+        Parameter number: The edit number
+        Precondition: number is an int, 0 <= number < len(self._edits)
+        """
+        begin=max((k for k in self._snapshots if k<=number),default=-1)
+        image=self._start if begin<0 else self._snapshots[begin]
+        recipe=[operation for edit in self._edits[begin+1:number+1] for operation in edit]
+        return apply(image,recipe)
+
+
+def _record(name):
+    """
+    Returns: The Editor method with the given name, changed to record each call
+
+    Keyword arguments are recorded as positional ones (with the defaults of any 
+    arguments skipped before them), so every operation is a plain tuple.
+
+    Parameter name: The method name
+    Precondition: name is in OPERATIONS
+    """
+    method = getattr(a6editor.Editor,name)
+    signature = inspect.signature(method)
+    @functools.wraps(method)
+    def operation(self,*args,**kwargs):
+        result = method(self,*args,**kwargs)
+        if result is not False:
+            if kwargs:
+                bound = signature.bind(self,*args,**kwargs)
+                bound.apply_defaults()
+                args = tuple(bound.arguments.values())[1:]
+            self._edits[-1].append((name,)+args)
+        return result
+    return operation
+
+
+for _name in OPERATIONS:
+    setattr(LogEditor,_name,_record(_name))
+
+
+def apply(image, recipe):
+    """
+    Returns: A new image with the operations of recipe applied to image
+
+    The image itself is not changed.  The operations are applied in order, as a
+    single edit.
+
+    Parameter image: The image to edit
+    Precondition: image is an Image object
+
+    Parameter recipe: The operations to apply
+    Precondition: recipe is a list of operations (tuples of a name in OPERATIONS and
+    the arguments for that Editor method)
+    """
+    editor = a6editor.Editor(image)
+    for operation in recipe:
+        assert _is_operation(operation), repr(operation)+' is not an operation'
+        getattr(editor,operation[0])(*operation[1:])
+    return editor.getCurrent()
+
+
+def save(recipe, filename):
+    """
+    Writes recipe to a text file, with one operation per line.
+
+    Each operation is written as a Python tuple, so the file can be edited by hand.
+
+    Parameter recipe: The operations to save
+    Precondition: recipe is a list of operations with only literal arguments
+
+    Parameter filename: The file to write
+    Precondition: filename is a string
+    """
+    with open(filename,'w') as file:
+        for operation in recipe:
+            assert _is_operation(operation), repr(operation)+' is not an operation'
+            file.write(repr(tuple(operation))+'\n')
+
+
+def load(filename):
+    """
+    Returns: The recipe read from the given text file
+
+    The file should have been written by save.  Blank lines are skipped.
+
+    Parameter filename: The file to read
+    Precondition: filename is a string naming a recipe file
+    """
+    recipe = []
+    with open(filename) as file:
+        for line in file:
+            if line.strip():
+                operation = ast.literal_eval(line)
+                if not _is_operation(operation):
+                    raise ValueError(repr(line.strip())+' is not an operation')
+                recipe.append(operation)
+    return recipe
+
+
+def _is_operation(operation):
+    """
+    Returns: True if operation is an operation tuple, False otherwise
+
+    Parameter operation: The value to check
+    Precondition: NONE
+    """
+    return (isinstance(operation,tuple) and len(operation) > 0 and
+            operation[0] in OPERATIONS)